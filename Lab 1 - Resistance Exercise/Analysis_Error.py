@@ -38,7 +38,7 @@ def calculate_uncertainty_R2(R_A, dR_A, m2, dm2):
     R2_error = addition(
         delta_x = dR_A,
         delta_y = dm2,
-        delta_w = np.zeros_like(m1)
+        delta_w = np.zeros_like(m2)
     )
 
     R2 = - (m2 + R_A)
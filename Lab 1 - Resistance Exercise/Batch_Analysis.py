@@ -0,0 +1,275 @@
+"""
+Headless batch analysis of Lab 1 measurement files.
+
+Each measurement file (CSV with a header row, or NPZ) holds the columns
+    I, dI, V, dV        current (A) and voltage (V) readings with uncertainties
+    R_li, dR_li         optional load resistances (Ω) with uncertainties
+For every file the V vs I line is fitted with linear_fitter. Circuit 1 files with
+load resistances also give the ammeter resistance R_A, circuit 2 files the
+voltmeter resistance R_V.
+
+R1 and R2 need both circuits: R1 = m1 R_V / (R_V - m1) takes the circuit 1 slope
+with R_V from the circuit 2 data, and R2 = -(m2 + R_A) the circuit 2 slope with R_A
+from the circuit 1 data. They are computed for every pair of manifest entries that
+share a "pair" name, once both files have been fitted.
+
+Usage:
+    python Batch_Analysis.py DATA_DIR_OR_MANIFEST [--circuit N] [--workers N]
+                             [--output results.json] [--plot FIG_DIR] [--cache CACHE_DIR]
+
+A manifest is a JSON list of {"path": ..., "circuit": 1 or 2, "name": ..., "pair": ...}
+entries, with paths relative to the manifest ("name" and "pair" are optional). The
+output is a JSON object with the per-file results under "files" and the R1/R2
+results under "pairs". Heavy modules (scipy, matplotlib) are only
+imported by the steps that need them. With --cache, fits and propagated
+uncertainties are memoized on disk (Result_Cache), so a rerun only recomputes the
+results of files whose data changed.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Column names expected in each measurement file
+COLUMNS = ('I', 'dI', 'V', 'dV', 'R_li', 'dR_li')
+
+def find_inputs(source, circuit=None):
+    """
+    Function Description:
+    Lists the measurement files to analyse from a directory or a JSON manifest.
+
+    Parameters:
+    source (str): Directory of .csv/.npz files, or path to a JSON manifest.
+    circuit (int): Circuit option applied to entries that do not give one.
+
+    Returns:
+    list: List of dictionaries with the keys path, name and circuit (and pair, for
+          manifest entries that give one).
+    """
+    if os.path.isdir(source):
+        entries = [{'path': os.path.join(source, name)}
+                   for name in sorted(os.listdir(source))
+                   if name.lower().endswith(('.csv', '.npz'))]
+    else:
+        with open(source) as manifest:
+            entries = json.load(manifest)
+        base = os.path.dirname(os.path.abspath(source))
+        for entry in entries:
+            entry['path'] = os.path.join(base, entry['path'])
+
+    for entry in entries:
+        entry.setdefault('name', os.path.splitext(os.path.basename(entry['path']))[0])
+        entry.setdefault('circuit', circuit)
+
+    return entries
+
+def load_measurements(path):
+    """
+    Function Description:
+    Reads a measurement file into a dictionary of arrays.
+
+    Parameters:
+    path (str): Path to a .csv file with a header row or a .npz archive.
+
+    Returns:
+    dict: Dictionary mapping the column names present in the file to arrays.
+    """
+    import numpy as np
+
+    if path.lower().endswith('.npz'):
+        with np.load(path) as archive:
+            return {name: np.asarray(archive[name], dtype=float)
+                    for name in COLUMNS if name in archive.files}
+
+    table = np.genfromtxt(path, delimiter=',', names=True, dtype=float, encoding='utf-8')
+    return {name: np.atleast_1d(table[name]) for name in COLUMNS if name in table.dtype.names}
+
+def analyse_file(entry, plot_dir=None):
+    """
+    Function Description:
+    Runs the Lab 1 pipeline on one measurement file.
+
+    Parameters:
+    entry (dict): Dictionary with the keys path, name and circuit (and optionally pair).
+    plot_dir (str): Directory to save the V vs I figure in (no plot if None).
+
+    Returns:
+    dict: JSON-serializable dictionary of results.
+    """
+    import numpy as np
+    from Linear_Fitting import linear_fitter
+
+    data = load_measurements(entry['path'])
+    I, V, dV = data['I'], data['V'], data['dV']
+
+    m, b, m_err, b_err, y_var, chi2, red_chi2, p_value, residuals = linear_fitter(I, V, dV)
+    result = {
+        'name': entry['name'],
+        'path': entry['path'],
+        'circuit': entry['circuit'],
+        'pair': entry.get('pair'),
+        'N': int(I.size),
+        'fit': {
+            'm': float(m), 'b': float(b),
+            'm_stdrd_dev': float(m_err), 'b_stdrd_dev': float(b_err),
+            'y_variance': float(y_var), 'chi_squared': float(chi2),
+            'reduced_chi_squared': float(red_chi2), 'p_value': float(p_value),
+            'residuals': residuals.tolist(),
+        },
+    }
+
+    if 'R_li' in data:
+        R_li, dR_li, dI = data['R_li'], data['dR_li'], data['dI']
+
+        if entry['circuit'] == 1:
+            from Resistance_Calc import calculate_uncertainty_R_A
+
+            # The propagation rules return signed uncertainties (z * relative error)
+            R_A = (V / I) - R_li
+            dR_A = np.abs(calculate_uncertainty_R_A(V, I, dV, dI, dR_li))
+            result.update(R_A=R_A.tolist(), dR_A=dR_A.tolist(),
+                          R_A_mean=float(np.mean(R_A)), dR_A_mean=float(np.average(dR_A)))
+
+        elif entry['circuit'] == 2:
+            from Resistance_Calc import calculate_uncertainty_R_V
+
+            R_V = (V * R_li) / (I * R_li - V)
+            dR_V = np.abs(calculate_uncertainty_R_V(V, I, R_li, dV, dI, dR_li))
+            result.update(R_V=R_V.tolist(), dR_V=dR_V.tolist(),
+                          R_V_mean=float(np.mean(R_V)), dR_V_mean=float(np.average(dR_V)))
+
+    if plot_dir is not None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from Linear_Fitting import plot_V_vs_I
+
+        fig = plot_V_vs_I(I, V, data['dI'], dV, m, b, residuals, entry['name'])
+        result['figure'] = os.path.join(plot_dir, entry['name'] + '.png')
+        fig.savefig(result['figure'])
+        plt.close(fig)
+
+    return result
+
+def _analyse_entry(task):
+    """
+    Function Description:
+    Worker wrapper reporting errors per file instead of aborting the batch.
+    """
+    entry, plot_dir = task
+    try:
+        return analyse_file(entry, plot_dir)
+    except Exception as error:
+        return {'name': entry['name'], 'path': entry['path'], 'error': f"{type(error).__name__}: {error}"}
+
+def _use_cache(cache_dir):
+    """
+    Function Description:
+    Memoizes the Lab 1 fits and propagation functions in this process.
+    """
+    import Result_Cache
+    Result_Cache.configure(cache_dir)
+    Result_Cache.install()
+
+def run_batch(entries, workers=1, plot_dir=None, cache_dir=None):
+    """
+    Function Description:
+    Analyses many measurement files, on a process pool if workers > 1.
+
+    Parameters:
+    entries (list): List of dictionaries from find_inputs.
+    workers (int): Number of worker processes.
+    plot_dir (str): Directory to save figures in (no plots if None).
+    cache_dir (str): Directory of the on-disk result cache (no caching if None).
+
+    Returns:
+    list: List of result dictionaries, in the order of entries.
+    """
+    tasks = [(entry, plot_dir) for entry in entries]
+
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        initializer, initargs = (_use_cache, (cache_dir,)) if cache_dir is not None else (None, ())
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+            return list(executor.map(_analyse_entry, tasks))
+
+    if cache_dir is not None:
+        _use_cache(cache_dir)
+    return [_analyse_entry(task) for task in tasks]
+
+def combine_pairs(results):
+    """
+    Function Description:
+    Computes R1 and R2 for every pair of circuit 1 and circuit 2 results that share
+    a pair name: R1 from the circuit 1 slope and the circuit 2 R_V, R2 from the
+    circuit 2 slope and the circuit 1 R_A.
+
+    Parameters:
+    results (list): List of result dictionaries from run_batch.
+
+    Returns:
+    list: List of dictionaries with the keys pair, circuit1, circuit2, R1, dR1, R2
+          and dR2 (or error, if a pair is incomplete).
+    """
+    from Analysis_Error import calculate_uncertainty_R1, calculate_uncertainty_R2
+
+    pairs = {}
+    for result in results:
+        if result.get('pair') is not None:
+            pairs.setdefault(result['pair'], []).append(result)
+
+    combined = []
+    for pair, members in pairs.items():
+        circuit1 = [result for result in members if result.get('circuit') == 1 and 'R_A_mean' in result]
+        circuit2 = [result for result in members if result.get('circuit') == 2 and 'R_V_mean' in result]
+        if len(circuit1) != 1 or len(circuit2) != 1:
+            combined.append({'pair': pair, 'error': "a pair needs one analysed circuit 1 file and one "
+                                                    "analysed circuit 2 file with load resistances"})
+            continue
+        circuit1, circuit2 = circuit1[0], circuit2[0]
+        m1, dm1 = circuit1['fit']['m'], circuit1['fit']['m_stdrd_dev']
+        m2, dm2 = circuit2['fit']['m'], circuit2['fit']['m_stdrd_dev']
+
+        R1, R1_error = calculate_uncertainty_R1(circuit2['R_V_mean'], m1, circuit2['dR_V_mean'], dm1)
+        R2, R2_error = calculate_uncertainty_R2(circuit1['R_A_mean'], circuit1['dR_A_mean'], m2, dm2)
+        combined.append({'pair': pair, 'circuit1': circuit1['name'], 'circuit2': circuit2['name'],
+                         'R1': float(R1), 'dR1': abs(float(R1_error)),
+                         'R2': float(R2), 'dR2': abs(float(R2_error))})
+
+    return combined
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch analysis of Lab 1 V-I measurement files.")
+    parser.add_argument('source', help="directory of .csv/.npz files or a JSON manifest")
+    parser.add_argument('--circuit', type=int, choices=(1, 2), default=None,
+                        help="circuit option for files not listed with one in a manifest")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--output', default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument('--plot', metavar='FIG_DIR', default=None,
+                        help="save a V vs I figure per file into FIG_DIR")
+    parser.add_argument('--cache', metavar='CACHE_DIR', default=None,
+                        help="reuse fits and propagated uncertainties cached in CACHE_DIR")
+    args = parser.parse_args(argv)
+
+    # Make the Lab 1 modules importable from the worker processes
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.plot is not None:
+        os.makedirs(args.plot, exist_ok=True)
+
+    results = run_batch(find_inputs(args.source, args.circuit), args.workers, args.plot, args.cache)
+    pairs = combine_pairs(results)
+    report = {'files': results, 'pairs': pairs}
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    return 1 if any('error' in result for result in results + pairs) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""
+Benchmark suite for the Lab 1 analysis kernels.
+
+Every kernel is run on synthetic V-I measurement data over a size sweep: 10 to 10^7
+points for the element-wise propagation functions, linear_fitter and the end-to-end
+pipeline, and 1 to 10^5 datasets (of POINTS_PER_DATASET points) for the batched fits.
+For each kernel and size the best time per call over several repeats is recorded,
+with the throughput (points or datasets per second) and the peak memory allocated
+during one call (measured separately with tracemalloc).
+
+Results are appended to a JSON history file. A run fails (exit status 1) when a
+kernel's throughput drops, or its peak memory grows, by more than the threshold
+relative to the median of the latest passing runs in the history (once there are
+at least three). Calls faster than the noise floor (1 ms) are too noisy for a
+throughput gate and only have their memory checked, and a throughput drop is only
+reported if it reproduces when the kernel is timed a second time.
+
+Usage:
+    python Benchmark_Suite.py [--history benchmark_history.json] [--threshold 0.25]
+                              [--baseline-runs 5] [--noise-floor 0.001]
+                              [--max-points N] [--max-datasets N] [--kernels NAME ...]
+                              [--quick] [--no-save]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Number of points in each dataset of the dataset sweeps
+POINTS_PER_DATASET = 10
+
+# Number of latest passing runs whose median is the regression baseline
+BASELINE_RUNS = 5
+
+# Fewest passing runs needed before throughput is checked for regressions
+MIN_BASELINE_RUNS = 3
+
+# Time per call (s) below which throughput is not checked for regressions
+NOISE_FLOOR = 1e-3
+
+def synthetic_measurements(n_points, rng, n_datasets=None):
+    """
+    Function Description:
+    Generates circuit option 1 style measurements: a 6.5 V source with a small
+    internal resistance, load resistances from 100 Ω to 100 kΩ and meter uncertainties.
+
+    Parameters:
+    n_points (int): Number of points (per dataset).
+    rng (Generator): NumPy random generator.
+    n_datasets (int): Number of datasets (None for a single 1-D dataset).
+
+    Returns:
+    dict: Dictionary with the arrays I, dI, V, dV, R_li and dR_li.
+    """
+    shape = (n_points,) if n_datasets is None else (n_datasets, n_points)
+    R_li = 10.0 ** rng.uniform(2.0, 5.0, shape)  # Ω
+    I = 6.501 / (R_li + 1.8)  # A
+    dI = 0.003 * I + 1e-6
+    V = 6.501 - 1.8 * I + rng.normal(0.0, 0.005, shape)  # V
+
+    return {'I': I + rng.normal(0.0, 1.0, shape) * dI, 'dI': dI,
+            'V': V, 'dV': np.full(shape, 0.005),
+            'R_li': R_li, 'dR_li': 0.0025 * R_li}
+
+def _lab1_pipeline(data):
+    """
+    Function Description:
+    End-to-end Lab 1 analysis: V vs I fit, per-point R_A and R_V with propagated
+    uncertainties, then R2 and R1.
+    """
+    from Linear_Fitting import linear_fitter
+    from Resistance_Calc import calculate_uncertainty_R_A, calculate_uncertainty_R_V
+    from Analysis_Error import calculate_uncertainty_R1, calculate_uncertainty_R2
+
+    I, dI, V, dV, R_li, dR_li = (data[name] for name in ('I', 'dI', 'V', 'dV', 'R_li', 'dR_li'))
+    m, b, m_err = linear_fitter(I, V, dV)[:3]
+
+    R_A = (V / I) - R_li
+    dR_A = calculate_uncertainty_R_A(V, I, dV, dI, dR_li)
+    R2 = calculate_uncertainty_R2(np.mean(R_A), np.average(dR_A), m, m_err)
+
+    R_V = (V * R_li) / (I * R_li - V)
+    dR_V = calculate_uncertainty_R_V(V, I, R_li, dV, dI, dR_li)
+    R1 = calculate_uncertainty_R1(np.mean(R_V), m, np.average(dR_V), m_err)
+
+    return R1, R2
+
+def _setup_multiplication(data):
+    from Error_Propagation import multiplication
+    z = data['V'] / data['I']
+    ones, zeros = np.ones_like(z), np.zeros_like(z)
+    return lambda: multiplication(data['V'], data['dV'], data['I'], data['dI'], ones, zeros, z)
+
+def _setup_addition(data):
+    from Error_Propagation import addition
+    return lambda: addition(data['dV'], data['dI'], data['dR_li'])
+
+def _setup_linear_fitter(data):
+    from Linear_Fitting import linear_fitter
+    return lambda: linear_fitter(data['I'], data['V'], data['dV'])
+
+def _setup_R_A(data):
+    from Resistance_Calc import calculate_uncertainty_R_A
+    return lambda: calculate_uncertainty_R_A(data['V'], data['I'], data['dV'], data['dI'], data['dR_li'])
+
+def _setup_R_V(data):
+    from Resistance_Calc import calculate_uncertainty_R_V
+    return lambda: calculate_uncertainty_R_V(data['V'], data['I'], data['R_li'],
+                                             data['dV'], data['dI'], data['dR_li'])
+
+def _setup_R1(data):
+    from Analysis_Error import calculate_uncertainty_R1
+    R_V = 6.3e6 * (1 + 0.01 * data['V'])
+    m1 = np.full_like(R_V, -0.046)
+    return lambda: calculate_uncertainty_R1(R_V, m1, 0.07 * R_V, np.full_like(R_V, 0.004))
+
+def _setup_R2(data):
+    from Analysis_Error import calculate_uncertainty_R2
+    R_A = data['V'] / data['I'] - data['R_li']
+    m2 = np.full_like(R_A, -1.813)
+    return lambda: calculate_uncertainty_R2(R_A, data['dR_li'], m2, np.full_like(R_A, 0.003))
+
+def _setup_plot(data):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from Linear_Fitting import linear_fitter, plot_V_vs_I
+
+    m, b, residuals = (lambda fit: (fit[0], fit[1], fit[-1]))(linear_fitter(data['I'], data['V'], data['dV']))
+
+    def run():
+        fig = plot_V_vs_I(data['I'], data['V'], data['dI'], data['dV'], m, b, residuals, 'benchmark')
+        fig.canvas.draw()
+        plt.close(fig)
+    return run
+
+def _setup_pipeline(data):
+    return lambda: _lab1_pipeline(data)
+
+def _setup_batch_linear_fitter(data):
+    from Linear_Fitting import batch_linear_fitter
+    return lambda: batch_linear_fitter(data['I'], data['V'], data['dV'])
+
+def _setup_linear_fitter_loop(data):
+    from Linear_Fitting import linear_fitter
+    return lambda: [linear_fitter(I, V, dV) for I, V, dV in zip(data['I'], data['V'], data['dV'])]
+
+# name: (sweep axis, setup function, largest size run)
+BENCHMARKS = {
+    'multiplication': ('points', _setup_multiplication, 10**7),
+    'addition': ('points', _setup_addition, 10**7),
+    'linear_fitter': ('points', _setup_linear_fitter, 10**7),
+    'calculate_uncertainty_R_A': ('points', _setup_R_A, 10**7),
+    'calculate_uncertainty_R_V': ('points', _setup_R_V, 10**7),
+    'calculate_uncertainty_R1': ('points', _setup_R1, 10**7),
+    'calculate_uncertainty_R2': ('points', _setup_R2, 10**7),
+    'plot_V_vs_I': ('points', _setup_plot, 10**4),
+    'lab1_pipeline': ('points', _setup_pipeline, 10**7),
+    'batch_linear_fitter': ('datasets', _setup_batch_linear_fitter, 10**5),
+    'linear_fitter_loop': ('datasets', _setup_linear_fitter_loop, 10**4),
+}
+
+def time_kernel(run, min_time=0.2, repeats=5):
+    """
+    Function Description:
+    Best time per call of run(), over repeats timings of enough calls to last min_time.
+
+    Parameters:
+    run (callable): Kernel call without arguments.
+    min_time (float): Minimum duration of each timing (s).
+    repeats (int): Number of timings.
+
+    Returns:
+    float: Best time per call (s).
+    """
+    start = time.perf_counter()
+    run()
+    single = time.perf_counter() - start
+
+    number = max(1, int(min_time / max(single, 1e-9)))
+    best = single
+    for _ in range(repeats if single < min_time else 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+def peak_memory(run):
+    """
+    Function Description:
+    Peak memory allocated (bytes) during one call of run(), from tracemalloc. Tracing
+    started by the caller is reused and left running.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+
+def run_benchmarks(kernels=None, max_points=10**7, max_datasets=10**5, min_time=0.2, repeats=5,
+                   seed=0, log=None):
+    """
+    Function Description:
+    Runs the size sweeps of the selected kernels.
+
+    Parameters:
+    kernels (sequence): Names of kernels in BENCHMARKS to run (default: all).
+    max_points (int): Largest number of points in the point sweeps.
+    max_datasets (int): Largest number of datasets in the dataset sweeps.
+    min_time (float): Minimum duration of each timing (s).
+    repeats (int): Number of timings per kernel and size.
+    seed (int): Seed of the synthetic data.
+    log (file): Stream to print progress to (None for silent runs).
+
+    Returns:
+    dict: Dictionary mapping 'kernel/axis=size' to dictionaries with the keys
+          seconds, throughput and peak_bytes.
+    """
+    results = {}
+    rng = np.random.default_rng(seed)
+
+    for name in kernels or BENCHMARKS:
+        axis, setup, largest = BENCHMARKS[name]
+        limit = min(largest, max_points if axis == 'points' else max_datasets)
+        sizes = [10**k for k in range(0 if axis == 'datasets' else 1, 8) if 10**k <= limit]
+
+        for size in sizes:
+            run = setup(_benchmark_data(axis, size, rng))
+
+            seconds = time_kernel(run, min_time, repeats)
+            key = f"{name}/{axis}={size}"
+            results[key] = {'seconds': seconds, 'throughput': size / seconds,
+                            'peak_bytes': peak_memory(run)}
+            if log is not None:
+                print(f"{key:<45} {seconds * 1e3:12.4f} ms {size / seconds:12.4g} {axis}/s "
+                      f"{results[key]['peak_bytes'] / 2**20:10.2f} MiB", file=log)
+                log.flush()
+
+    return results
+
+def _benchmark_data(axis, size, rng):
+    """
+    Function Description:
+    Synthetic data of one sweep size: size points, or size datasets of
+    POINTS_PER_DATASET points.
+    """
+    if axis == 'points':
+        return synthetic_measurements(size, rng)
+    return synthetic_measurements(POINTS_PER_DATASET, rng, n_datasets=size)
+
+def retime(results, keys, min_time=0.2, repeats=5, seed=1):
+    """
+    Function Description:
+    Times the given kernels and sizes again (on fresh data) and keeps the faster of
+    the two timings in results, so a transient slowdown of the machine is not
+    mistaken for a regression.
+
+    Parameters:
+    results (dict): Dictionary returned by run_benchmarks (updated in place).
+    keys (sequence): Keys 'kernel/axis=size' to time again.
+    min_time (float): Minimum duration of each timing (s).
+    repeats (int): Number of timings per kernel and size.
+    seed (int): Seed of the synthetic data.
+    """
+    rng = np.random.default_rng(seed)
+    for key in keys:
+        name, sweep = key.split('/')
+        axis, size = sweep.split('=')
+        size = int(size)
+        seconds = time_kernel(BENCHMARKS[name][1](_benchmark_data(axis, size, rng)), min_time, repeats)
+        if seconds < results[key]['seconds']:
+            results[key].update(seconds=seconds, throughput=size / seconds)
+
+def load_history(path):
+    """
+    Function Description:
+    Reads the JSON benchmark history (an empty history if the file does not exist).
+    """
+    if not os.path.exists(path):
+        return {'version': 1, 'runs': []}
+    with open(path) as history:
+        return json.load(history)
+
+def find_regressions(results, history, threshold=0.25, baseline_runs=BASELINE_RUNS,
+                     noise_floor=NOISE_FLOOR, min_runs=MIN_BASELINE_RUNS):
+    """
+    Function Description:
+    Compares results with the median throughput and peak memory of the latest
+    baseline_runs passing runs in the history that measured the same kernel and
+    size. Throughput is only compared once min_runs runs are available, so a single
+    lucky run cannot set the baseline, and for calls slower than noise_floor, since
+    shorter timings vary by more than any useful threshold between runs.
+
+    Parameters:
+    results (dict): Dictionary returned by run_benchmarks.
+    history (dict): Benchmark history from load_history.
+    threshold (float): Allowed fractional throughput drop or peak memory growth.
+    baseline_runs (int): Number of latest passing runs in the baseline.
+    noise_floor (float): Time per call (s) below which throughput is not checked.
+    min_runs (int): Fewest passing runs needed to check throughput.
+
+    Returns:
+    list: List of (key, metric, baseline, current) tuples for every regression.
+    """
+    measured = {}
+    for run in history['runs']:
+        if not run.get('regressions'):
+            for key, result in run['results'].items():
+                measured.setdefault(key, []).append(result)
+
+    regressions = []
+    for key, current in results.items():
+        previous = measured.get(key, [])[-baseline_runs:]
+        if not previous:
+            continue
+        throughput = float(np.median([result['throughput'] for result in previous]))
+        peak_bytes = float(np.median([result['peak_bytes'] for result in previous]))
+        slow_enough = min(current['seconds'], *(result['seconds'] for result in previous)) >= noise_floor
+        if (len(previous) >= min_runs and slow_enough
+                and current['throughput'] < throughput * (1 - threshold)):
+            regressions.append((key, 'throughput', throughput, current['throughput']))
+        if current['peak_bytes'] > peak_bytes * (1 + threshold) + 4096:
+            regressions.append((key, 'peak_bytes', peak_bytes, current['peak_bytes']))
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Lab 1 analysis kernels.")
+    parser.add_argument('--history', default='benchmark_history.json',
+                        help="JSON history of benchmark runs (default: %(default)s)")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed fractional throughput drop or peak memory growth")
+    parser.add_argument('--baseline-runs', type=int, default=BASELINE_RUNS,
+                        help="latest passing runs whose median is the baseline (default: %(default)s)")
+    parser.add_argument('--noise-floor', type=float, default=NOISE_FLOOR,
+                        help="time per call (s) below which throughput is not checked (default: %(default)s)")
+    parser.add_argument('--max-points', type=int, default=10**7, help="largest point sweep size")
+    parser.add_argument('--max-datasets', type=int, default=10**5, help="largest dataset sweep size")
+    parser.add_argument('--kernels', nargs='+', choices=sorted(BENCHMARKS), default=None,
+                        help="kernels to run (default: all)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="minimum duration of each timing (s)")
+    parser.add_argument('--repeats', type=int, default=5, help="timings per kernel and size")
+    parser.add_argument('--quick', action='store_true',
+                        help="short sweeps (up to 10^5 points and 10^3 datasets) with fewer repeats")
+    parser.add_argument('--no-save', action='store_true', help="do not append this run to the history")
+    args = parser.parse_args(argv)
+
+    # Make the Lab 1 modules importable from any working directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.quick:
+        args.max_points = min(args.max_points, 10**5)
+        args.max_datasets = min(args.max_datasets, 10**3)
+        args.min_time, args.repeats = 0.05, 3
+
+    results = run_benchmarks(args.kernels, args.max_points, args.max_datasets,
+                             args.min_time, args.repeats, log=sys.stdout)
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold, args.baseline_runs, args.noise_floor)
+
+    # A throughput drop has to reproduce in a second timing before it is reported
+    slower = sorted({key for key, metric, _, _ in regressions if metric == 'throughput'})
+    if slower:
+        retime(results, slower, args.min_time, args.repeats)
+        regressions = find_regressions(results, history, args.threshold, args.baseline_runs,
+                                       args.noise_floor)
+    for key, metric, previous, current in regressions:
+        print(f"REGRESSION {key} {metric}: {previous:.4g} -> {current:.4g}")
+
+    if not args.no_save:
+        history['runs'].append({
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'threshold': args.threshold,
+            'regressions': [list(regression) for regression in regressions],
+            'results': results,
+        })
+        with open(args.history + '.tmp', 'w') as output:
+            json.dump(history, output, indent=1)
+        os.replace(args.history + '.tmp', args.history)
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,500 @@
+import ast
+import inspect
+import numpy as np
+
+# Unary functions allowed in formulas: name -> NumPy function
+FUNCTIONS = {
+    'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'arcsin': np.arcsin, 'arccos': np.arccos, 'arctan': np.arctan,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'abs': np.absolute, 'sign': np.sign, 'square': np.square,
+}
+
+# Constants allowed in formula strings
+CONSTANTS = {'pi': np.pi, 'e': np.e}
+
+# NumPy ufunc -> node operation, for tracing Python functions that call np.sqrt etc.
+UFUNC_OPS = {
+    np.add: 'add', np.subtract: 'sub', np.multiply: 'mul',
+    np.divide: 'div', np.true_divide: 'div', np.power: 'pow', np.negative: 'neg',
+}
+UFUNC_OPS.update({ufunc: name for name, ufunc in FUNCTIONS.items()})
+
+# Cache of compiled formulas, keyed by formula and variable names
+_COMPILED = {}
+
+class _Node:
+    """
+    Class Description:
+    Node of a traced expression graph. Nodes are interned by their graph, so equal
+    subexpressions are shared and only evaluated once.
+    """
+
+    def __init__(self, graph, op, args=(), value=None):
+        self.graph = graph
+        self.op = op
+        self.args = args
+        self.value = value
+
+    def _binary(self, op, other, reflected=False):
+        other = self.graph.wrap(other)
+        if reflected:
+            return self.graph.node(op, (other, self))
+        return self.graph.node(op, (self, other))
+
+    def __add__(self, other):
+        return self._binary('add', other)
+
+    def __radd__(self, other):
+        return self._binary('add', other, True)
+
+    def __sub__(self, other):
+        return self._binary('sub', other)
+
+    def __rsub__(self, other):
+        return self._binary('sub', other, True)
+
+    def __mul__(self, other):
+        return self._binary('mul', other)
+
+    def __rmul__(self, other):
+        return self._binary('mul', other, True)
+
+    def __truediv__(self, other):
+        return self._binary('div', other)
+
+    def __rtruediv__(self, other):
+        return self._binary('div', other, True)
+
+    def __pow__(self, other):
+        return self._binary('pow', other)
+
+    def __rpow__(self, other):
+        return self._binary('pow', other, True)
+
+    def __neg__(self):
+        return self.graph.node('neg', (self,))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self.graph.node('abs', (self,))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs or ufunc not in UFUNC_OPS:
+            return NotImplemented
+        return self.graph.node(UFUNC_OPS[ufunc], tuple(self.graph.wrap(x) for x in inputs))
+
+class _Graph:
+    """
+    Class Description:
+    Expression graph with structural interning and basic constant folding.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.order = []
+
+    def _intern(self, op, args, value=None):
+        key = (op, tuple(id(arg) for arg in args), value)
+        node = self.nodes.get(key)
+        if node is None:
+            node = _Node(self, op, args, value)
+            self.nodes[key] = node
+            self.order.append(node)
+        return node
+
+    def variable(self, name):
+        return self._intern('var', (), name)
+
+    def constant(self, value):
+        return self._intern('const', (), float(value))
+
+    def wrap(self, operand):
+        if isinstance(operand, _Node):
+            return operand
+        if np.ndim(operand) != 0:
+            raise TypeError("Formulas may only contain scalar constants")
+        return self.constant(operand)
+
+    def node(self, op, args):
+        constants = [arg.value if arg.op == 'const' else None for arg in args]
+
+        # Fold operations on constants
+        if all(c is not None for c in constants):
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                if op in FUNCTIONS:
+                    return self.constant(FUNCTIONS[op](constants[0]))
+                return self.constant({
+                    'add': lambda a, b: a + b, 'sub': lambda a, b: a - b,
+                    'mul': lambda a, b: a * b, 'div': lambda a, b: np.divide(a, b),
+                    'pow': lambda a, b: np.power(a, b), 'neg': lambda a: -a,
+                }[op](*constants))
+
+        # Drop additions of zero and multiplications by zero or ±1
+        if op == 'add':
+            if constants[0] == 0.0:
+                return args[1]
+            if constants[1] == 0.0:
+                return args[0]
+        elif op == 'sub':
+            if constants[1] == 0.0:
+                return args[0]
+            if constants[0] == 0.0:
+                return self.node('neg', (args[1],))
+        elif op == 'mul':
+            if constants[0] == 0.0 or constants[1] == 0.0:
+                return self.constant(0.0)
+            if constants[0] == 1.0:
+                return args[1]
+            if constants[1] == 1.0:
+                return args[0]
+            if constants[0] == -1.0:
+                return self.node('neg', (args[1],))
+            if constants[1] == -1.0:
+                return self.node('neg', (args[0],))
+        elif op == 'div':
+            if constants[0] == 0.0:
+                return self.constant(0.0)
+            if constants[1] == 1.0:
+                return args[0]
+        elif op == 'pow':
+            if constants[1] == 1.0:
+                return args[0]
+            if constants[1] == 0.0:
+                return self.constant(1.0)
+        elif op == 'neg' and args[0].op == 'neg':
+            return args[0].args[0]
+
+        return self._intern(op, tuple(args))
+
+def _local_derivatives(node):
+    """
+    Function Description:
+    Returns the partial derivatives of a node with respect to each of its arguments,
+    as graph nodes.
+    """
+    g = node.graph
+    args = node.args
+    op = node.op
+
+    if op == 'add':
+        return [g.constant(1.0), g.constant(1.0)]
+    if op == 'sub':
+        return [g.constant(1.0), g.constant(-1.0)]
+    if op == 'mul':
+        return [args[1], args[0]]
+    if op == 'div':
+        return [1.0 / args[1], -node / args[1]]
+    if op == 'neg':
+        return [g.constant(-1.0)]
+    if op == 'pow':
+        base, exponent = args
+        d_base = exponent * base ** (exponent - 1.0)
+        if exponent.op == 'const':
+            return [d_base, g.constant(0.0)]
+        return [d_base, node * g.node('log', (base,))]
+
+    x = args[0]
+    return [{
+        'sqrt': lambda: 0.5 / node,
+        'exp': lambda: node,
+        'log': lambda: 1.0 / x,
+        'log10': lambda: 1.0 / (x * np.log(10.0)),
+        'sin': lambda: g.node('cos', (x,)),
+        'cos': lambda: -g.node('sin', (x,)),
+        'tan': lambda: 1.0 + node * node,
+        'arcsin': lambda: 1.0 / g.node('sqrt', (1.0 - x * x,)),
+        'arccos': lambda: -1.0 / g.node('sqrt', (1.0 - x * x,)),
+        'arctan': lambda: 1.0 / (1.0 + x * x),
+        'sinh': lambda: g.node('cosh', (x,)),
+        'cosh': lambda: g.node('sinh', (x,)),
+        'tanh': lambda: 1.0 - node * node,
+        'abs': lambda: g.node('sign', (x,)),
+        'sign': lambda: g.constant(0.0),
+        'square': lambda: 2.0 * x,
+    }[op]()]
+
+def _gradient(output, variables):
+    """
+    Function Description:
+    Symbolic reverse-mode differentiation of the output node with respect to each
+    variable node, sharing subexpressions through the graph.
+    """
+    g = output.graph
+
+    # Nodes reachable from the output, in evaluation order
+    reachable = set()
+    stack = [output]
+    while stack:
+        node = stack.pop()
+        if id(node) not in reachable:
+            reachable.add(id(node))
+            stack.extend(node.args)
+    ordered = [node for node in list(g.order) if id(node) in reachable]
+
+    adjoints = {id(output): g.constant(1.0)}
+    for node in reversed(ordered):
+        adjoint = adjoints.get(id(node))
+        if adjoint is None or not node.args:
+            continue
+        for arg, local in zip(node.args, _local_derivatives(node)):
+            contribution = adjoint * local
+            previous = adjoints.get(id(arg))
+            adjoints[id(arg)] = contribution if previous is None else previous + contribution
+
+    return [adjoints.get(id(variable), g.constant(0.0)) for variable in variables]
+
+def _generate_source(outputs, variables):
+    """
+    Function Description:
+    Emits the Python source of a vectorized NumPy function evaluating the output nodes.
+    """
+    names = {id(variable): variable.value for variable in variables}
+    lines = []
+
+    def emit(node):
+        if id(node) in names:
+            return names[id(node)]
+        if node.op == 'const':
+            if np.isnan(node.value):
+                return 'np.nan'
+            text = repr(node.value) if np.isfinite(node.value) else 'np.inf'
+            # Negative constants are parenthesized, so -2.0 ** x cannot bind as -(2.0 ** x)
+            if np.signbit(node.value):
+                return f"(-{text.lstrip('-')})"
+            return text
+        args = [emit(arg) for arg in node.args]
+        expression = {
+            'add': '{0} + {1}', 'sub': '{0} - {1}', 'mul': '{0} * {1}',
+            'div': '{0} / {1}', 'pow': '{0} ** {1}', 'neg': '-{0}',
+        }.get(node.op, 'np.' + FUNCTIONS.get(node.op, np.absolute).__name__ + '({0})')
+        name = f"t{len(lines)}"
+        lines.append(f"    {name} = " + expression.format(*args))
+        names[id(node)] = name
+        return name
+
+    results = [emit(node) for node in outputs]
+    header = f"def evaluate({', '.join(variable.value for variable in variables)}):"
+    partials = f"({', '.join(results[1:])},)" if len(results) > 1 else "()"
+    footer = f"    return {results[0]}, {partials}"
+    return "\n".join([header] + lines + [footer])
+
+def _parse_expression(expression, variables):
+    """
+    Function Description:
+    Parses a formula string, checking that it only uses arithmetic, the given
+    variables and the functions/constants allowed in formulas.
+    """
+    tree = ast.parse(expression.strip(), mode='eval')
+    allowed_names = set(variables) | set(FUNCTIONS) | set(CONSTANTS)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if node.id not in allowed_names:
+                raise ValueError(f"Unknown name '{node.id}' in formula")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError("Formulas may only call the functions in FUNCTIONS")
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+                                   ast.Load, ast.operator, ast.unaryop)):
+            raise ValueError(f"Unsupported syntax in formula: {type(node).__name__}")
+
+    return compile(tree, '<formula>', 'eval')
+
+class CompiledFormula:
+    """
+    Class Description:
+    Vectorized evaluator of a formula's value and Jacobian, generated once from the
+    formula's expression graph.
+
+    Attributes:
+    variables (tuple): Names of the formula inputs, in call order.
+    source (str): Generated Python source of the evaluator.
+    """
+
+    def __init__(self, variables, source):
+        self.variables = tuple(variables)
+        self.source = source
+        namespace = {'np': np}
+        exec(compile(source, '<compiled formula>', 'exec'), namespace)
+        self._evaluate = namespace['evaluate']
+
+    def jacobian(self, *values):
+        """
+        Function Description:
+        Evaluates the formula and its partial derivatives.
+
+        Parameters:
+        *values (array_like): One array of values per variable.
+
+        Returns:
+        tuple: A tuple containing (value, partials) with one partial derivative
+                array per variable (constant partials are returned as scalars).
+        """
+        values = [np.asarray(v, dtype=float) for v in values]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value, partials = self._evaluate(*values)
+
+        # Formulas that fold to a constant still return one value per input element
+        shape = np.broadcast_shapes(*(v.shape for v in values))
+        if np.shape(value) != shape:
+            value = np.broadcast_to(value, shape).copy()
+        return value, partials
+
+    def __call__(self, *values, sigmas=None, covariance=None):
+        """
+        Function Description:
+        Evaluates the formula and its first-order propagated uncertainty.
+
+        Parameters:
+        *values (array_like): One array of values per variable.
+        sigmas (sequence): One array of uncertainty values per variable (independent inputs).
+        covariance (array_like): Input covariance matrix, either (k, k) shared by all
+                                 elements or (..., k, k) per element. Takes
+                                 precedence over sigmas.
+
+        Returns:
+        tuple: A tuple containing (value, uncertainty)
+        """
+        value, partials = self.jacobian(*values)
+
+        if covariance is not None:
+            covariance = np.asarray(covariance, dtype=float)
+            if covariance.ndim == 2:
+                variance = 0.0
+                for i, d_i in enumerate(partials):
+                    for j, d_j in enumerate(partials):
+                        if covariance[i, j] != 0.0:
+                            variance = variance + d_i * covariance[i, j] * d_j
+            else:
+                J = np.stack(np.broadcast_arrays(value, *partials)[1:], axis=-1)
+                variance = np.einsum('...i,...ij,...j->...', J, covariance, J)
+        elif sigmas is not None:
+            variance = 0.0
+            for d_i, sigma_i in zip(partials, sigmas):
+                variance = variance + (d_i * sigma_i) ** 2
+        else:
+            variance = 0.0
+
+        uncertainty = np.sqrt(np.maximum(np.broadcast_to(variance, np.shape(value)), 0.0))
+        return value, uncertainty
+
+def _global_names(code):
+    """
+    Function Description:
+    Names a code object (and the functions nested in it) may look up as globals.
+    """
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= _global_names(constant)
+    return names
+
+def _function_key(formula, variables):
+    """
+    Function Description:
+    Cache key of a formula function: its code, the current values of the globals it
+    reads, its closure and its defaults, so rebinding any of them forces a recompile.
+    """
+    namespace = formula.__globals__
+    global_values = tuple(sorted((name, namespace[name]) for name in _global_names(formula.__code__)
+                                 if name in namespace))
+    closure = tuple(cell.cell_contents for cell in formula.__closure__ or ())
+    defaults = (formula.__defaults__, tuple(sorted((formula.__kwdefaults__ or {}).items())))
+    return (formula.__code__, global_values, closure, defaults, tuple(variables))
+
+def compile_formula(formula, variables=None):
+    """
+    Function Description:
+    Compiles a formula into a cached, vectorized value + Jacobian evaluator.
+    The derivatives are derived symbolically once per formula; later calls with the
+    same formula return the cached evaluator. Function formulas are keyed on their
+    code and the current values of the globals, closure variables and defaults they
+    use, and are not cached if any of those values is unhashable.
+
+    Parameters:
+    formula (str or callable): Expression string such as "(V*R_li)/(I*R_li - V)",
+                               or a Python function of the variables using
+                               arithmetic and NumPy ufuncs.
+    variables (sequence): Variable names in call order. Defaults to the function's
+                          arguments, or the names of a string formula in order of
+                          first appearance.
+
+    Returns:
+    CompiledFormula: The compiled evaluator.
+    """
+    if isinstance(formula, str):
+        if variables is None:
+            variables = []
+            for node in ast.walk(ast.parse(formula.strip(), mode='eval')):
+                if (isinstance(node, ast.Name) and node.id not in FUNCTIONS
+                        and node.id not in CONSTANTS and node.id not in variables):
+                    variables.append(node.id)
+        key = (formula, tuple(variables))
+    else:
+        if variables is None:
+            variables = list(inspect.signature(formula).parameters)
+        key = _function_key(formula, variables)
+
+    try:
+        compiled = _COMPILED.get(key)
+    except TypeError:
+        # Unhashable globals, closure or defaults: the result cannot be cached safely
+        key = None
+        compiled = None
+    if compiled is not None:
+        return compiled
+
+    graph = _Graph()
+    symbols = [graph.variable(name) for name in variables]
+
+    if isinstance(formula, str):
+        code = _parse_expression(formula, variables)
+        namespace = dict(FUNCTIONS)
+        namespace.update(CONSTANTS)
+        namespace.update(zip(variables, symbols))
+        output = graph.wrap(eval(code, {'__builtins__': {}}, namespace))
+    else:
+        output = graph.wrap(formula(*symbols))
+
+    partials = _gradient(output, symbols)
+    compiled = CompiledFormula(variables, _generate_source([output] + partials, symbols))
+    if key is not None:
+        _COMPILED[key] = compiled
+    return compiled
+
+if __name__ == "__main__":
+    from Resistance_Calc import calculate_uncertainty_R_V
+    from Analysis_Error import calculate_uncertainty_R1
+
+    # Circuit Option 2 values from Resistance_Calc
+    R_li = np.array([100.32, 219.91, 26814.0, 101570.0])  # Ω
+    delta_R_li = np.array([0.25, 0.49, 59.0, 250.0])  # Ω
+    V2 = np.array([6.386, 6.448, 6.501, 6.501])  # V
+    delta_V2 = np.array([0.005, 0.005, 0.005, 0.005])  # V
+    I2 = np.array([63.60, 29.322, 0.243, 0.065]) / 1000.0  # A
+    delta_I2 = np.array([0.18, 0.064, 0.051, 0.005]) / 1000.0  # A
+
+    R_V_formula = compile_formula("(V * R_li) / (I * R_li - V)", ["V", "I", "R_li"])
+    R_V, dR_V = R_V_formula(V2, I2, R_li, sigmas=(delta_V2, delta_I2, delta_R_li))
+
+    print("=== R_V: R_li in numerator and denominator ===")
+    print(f"R_V (Ω):                          {R_V}")
+    print(f"dR_V, correlated terms (Ω):       {dR_V}")
+    print(f"dR_V, step-by-step (Ω):           {np.abs(calculate_uncertainty_R_V(V2, I2, R_li, delta_V2, delta_I2, delta_R_li))}")
+    print()
+
+    # R1 = m1 * R_V / (R_V - m1), with m1 in both factors
+    R1_formula = compile_formula(lambda R_V, m1: m1 * R_V / (R_V - m1))
+    R1, dR1 = R1_formula(6.31e6, -0.046, sigmas=(4.62e8, 0.004))
+    R1_chain, dR1_chain = calculate_uncertainty_R1(6.31e6, -0.046, 4.62e8, 0.004)
+
+    print("=== R1: m1 in both factors ===")
+    print(f"R1 = {R1:.4e} ± {dR1:.4e} (correlated terms)")
+    print(f"R1 = {R1_chain:.4e} ± {abs(dR1_chain):.4e} (step-by-step)")
+    print()
+    print("Generated evaluator for R_V:")
+    print(R_V_formula.source)
@@ -0,0 +1,32 @@
+import sys
+
+def rebind_functions(replacements, installed):
+    """
+    Function Description:
+    Replaces every module-level name bound to one of the original functions, in all
+    loaded modules. This covers the defining module as well as names bound elsewhere
+    with 'from module import function'.
+
+    Parameters:
+    replacements (dict): Mapping of id(original) to (original, replacement) tuples.
+    installed (list): List that (module, attribute, original) is appended to for
+                      every name replaced, for restore_functions.
+    """
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if namespace is None:
+            continue
+        for attribute, value in list(namespace.items()):
+            replacement = replacements.get(id(value))
+            if replacement is not None and replacement[0] is value:
+                namespace[attribute] = replacement[1]
+                installed.append((module, attribute, value))
+
+def restore_functions(installed):
+    """
+    Function Description:
+    Undoes the replacements recorded in installed, most recent first, and empties it.
+    """
+    while installed:
+        namespace, attribute, value = installed.pop()
+        setattr(namespace, attribute, value)
@@ -0,0 +1,246 @@
+import numpy as np
+
+# Fields of the structured array of per-group results
+GROUP_DTYPE = np.dtype([
+    ('count', np.int64), ('n_used', np.int64), ('mean', float), ('sigma', float),
+    ('sigma_scaled', float), ('chi_squared', float), ('birge_ratio', float),
+])
+
+def sort_groups(*keys):
+    """
+    Function Description:
+    Sorts the rows once by their group keys and finds where each group starts.
+
+    Parameters:
+    *keys (array_like): One or more key arrays of equal length, e.g. instrument,
+                        range and resistor (numbers or strings).
+
+    Returns:
+    tuple: A tuple containing (order, starts, unique_keys) where order sorts the rows
+            by group, starts holds the first sorted row of every group and unique_keys
+            is a tuple with the key values of every group.
+    """
+    keys = [np.asarray(key) for key in keys]
+    order = np.lexsort(keys[::-1])
+    sorted_keys = [key[order] for key in keys]
+
+    changed = np.zeros(order.size, dtype=bool)
+    changed[:1] = True
+    for key in sorted_keys:
+        changed[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changed)
+
+    return order, starts, tuple(key[starts] for key in sorted_keys)
+
+def _reduce_moments(values, weights, used, starts):
+    """
+    Function Description:
+    Per-group count, total weight, weighted mean and centred chi-squared of sorted
+    values, with np.add.reduceat over the group boundaries.
+    """
+    w = np.where(used, weights, 0.0)
+    n = np.add.reduceat(used.astype(np.int64), starts)
+    W = np.add.reduceat(w, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.add.reduceat(w * values, starts) / W
+    group = np.repeat(np.arange(starts.size), np.diff(np.append(starts, values.size)))
+    chi_squared = np.add.reduceat(w * (values - mean[group]) ** 2, starts)
+    return n, W, mean, chi_squared, group
+
+def _group_results(count, n, W, mean, chi_squared):
+    """
+    Function Description:
+    Fills the structured per-group results from the reduced moments.
+    """
+    results = np.empty(count.size, dtype=GROUP_DTYPE)
+    results['count'] = count
+    results['n_used'] = n
+    results['mean'] = mean
+    results['chi_squared'] = chi_squared
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['sigma'] = 1.0 / np.sqrt(W)
+        results['birge_ratio'] = np.where(n > 1, np.sqrt(chi_squared / (n - 1)), np.nan)
+
+    # Inflate the uncertainty of inconsistent groups by the Birge ratio (never shrink it)
+    results['sigma_scaled'] = results['sigma'] * np.fmax(results['birge_ratio'], 1.0)
+    return results
+
+def grouped_weighted_mean(values, sigmas, *keys, clip=None, max_iterations=10, return_mask=False):
+    """
+    Function Description:
+    Inverse-variance weighted mean of every group of repeated measurements, with the
+    combined uncertainty 1/sqrt(sum(1/sigma**2)), the chi-squared about the mean and
+    the Birge ratio sqrt(chi_squared / (n - 1)). The rows are sorted by key once and
+    every reduction is an np.add.reduceat over the group boundaries.
+
+    With clip set, measurements more than clip standard deviations (their own sigma)
+    from their group mean are rejected and the means recomputed, until the set of
+    rejected measurements stops changing or max_iterations is reached.
+
+    Parameters:
+    values (array_like): Array of measured values, e.g. propagated resistances.
+    sigmas (array_like): Array of uncertainty values for the measurements; signs are
+                         ignored (multiplication returns signed uncertainties), and
+                         zero or non-finite values exclude a measurement.
+    *keys (array_like): Group key arrays (no keys: one group of all measurements).
+    clip (float): Sigma-clipping threshold (no clipping if None).
+    max_iterations (int): Maximum number of clipping passes.
+    return_mask (bool): Also return the mask of measurements kept after clipping.
+
+    Returns:
+    tuple: A tuple containing (unique_keys, results) where results is a structured
+            array with one record per group and the fields (count, n_used, mean,
+            sigma, sigma_scaled, chi_squared, birge_ratio); with return_mask, the
+            boolean mask of kept measurements (in the input order) is appended.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    sigmas = np.abs(np.broadcast_to(np.asarray(sigmas, dtype=float), values.shape)).ravel()
+    if not keys:
+        keys = (np.zeros(values.size, dtype=int),)
+
+    order, starts, unique_keys = sort_groups(*keys)
+    values = values[order]
+    sigmas = sigmas[order]
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / sigmas**2
+    valid = np.isfinite(values) & (sigmas > 0) & np.isfinite(sigmas)
+    count = np.add.reduceat(valid.astype(np.int64), starts)
+    used = valid
+
+    n, W, mean, chi_squared, group = _reduce_moments(values, weights, used, starts)
+    if clip is not None:
+        for _ in range(max_iterations):
+            kept = valid & (np.abs(values - mean[group]) <= clip * sigmas)
+            if np.array_equal(kept, used):
+                break
+            used = kept
+            n, W, mean, chi_squared, group = _reduce_moments(values, weights, used, starts)
+
+    results = _group_results(count, n, W, mean, chi_squared)
+    if return_mask:
+        mask = np.empty_like(used)
+        mask[order] = used
+        return unique_keys, results, mask
+    return unique_keys, results
+
+class GroupedAccumulator:
+    """
+    Class Description:
+    Streaming version of grouped_weighted_mean for logs too large to hold in memory.
+    Each chunk is reduced to per-group (count, total weight, mean, chi-squared)
+    partial moments, which are merged with the running ones by sorting the combined
+    partials by key and reducing them with np.add.reduceat, so new groups may appear
+    in any chunk. Sigma clipping needs the final means and is not applied here.
+
+    Parameters:
+    n_keys (int): Number of key arrays passed to update.
+    """
+
+    def __init__(self, n_keys=1):
+        self.keys = tuple(np.empty(0) for _ in range(n_keys))
+        self.count = np.zeros(0, dtype=np.int64)
+        self.W = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.chi_squared = np.zeros(0)
+
+    def _merge(self, keys, count, W, mean, chi_squared):
+        # Concatenate the partial moments and combine those of equal keys
+        keys = [np.concatenate((a, b)) if a.size else np.asarray(b) for a, b in zip(self.keys, keys)]
+        count = np.concatenate((self.count, count))
+        W = np.concatenate((self.W, W))
+        mean = np.nan_to_num(np.concatenate((self.mean, mean)))
+        chi_squared = np.concatenate((self.chi_squared, chi_squared))
+
+        order, starts, self.keys = sort_groups(*keys)
+        count, W, mean, chi_squared = count[order], W[order], mean[order], chi_squared[order]
+        group = np.repeat(np.arange(starts.size), np.diff(np.append(starts, order.size)))
+
+        self.count = np.add.reduceat(count, starts)
+        self.W = np.add.reduceat(W, starts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean = np.add.reduceat(W * mean, starts) / self.W
+        spread = W * (mean - np.nan_to_num(self.mean)[group]) ** 2
+        self.chi_squared = np.add.reduceat(chi_squared + spread, starts)
+
+    def update(self, values, sigmas, *keys):
+        """
+        Function Description:
+        Adds a chunk of measurements to the running group statistics.
+
+        Parameters:
+        values (array_like): Array of measured values.
+        sigmas (array_like): Array of uncertainty values (signs are ignored).
+        *keys (array_like): Group key arrays of the chunk.
+        """
+        if len(keys) != len(self.keys):
+            raise ValueError(f"Expected {len(self.keys)} key arrays, got {len(keys)}")
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        sigmas = np.abs(np.broadcast_to(np.asarray(sigmas, dtype=float), values.shape)).ravel()
+
+        order, starts, unique_keys = sort_groups(*keys)
+        values, sigmas = values[order], sigmas[order]
+        used = np.isfinite(values) & (sigmas > 0) & np.isfinite(sigmas)
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / sigmas**2
+        n, W, mean, chi_squared, _ = _reduce_moments(values, weights, used, starts)
+        self._merge(unique_keys, n, W, mean, chi_squared)
+
+    def merge(self, other):
+        """
+        Function Description:
+        Merges the statistics of another accumulator into this one.
+        """
+        self._merge(other.keys, other.count, other.W, other.mean, other.chi_squared)
+
+    def result(self):
+        """
+        Function Description:
+        Returns the grouped statistics of all data added so far.
+
+        Returns:
+        tuple: A tuple containing (unique_keys, results) as from grouped_weighted_mean.
+        """
+        return self.keys, _group_results(self.count, self.count, self.W, self.mean, self.chi_squared)
+
+if __name__ == "__main__":
+    from Resistance_Calc import calculate_uncertainty_R_A
+
+    # Circuit option 1 ammeter resistances: the plain mean ignores how different the uncertainties are
+    R_li = np.array([100.32, 219.91, 26814.0, 101570.0])  # Ω
+    V1 = np.full(4, 6.501)  # V
+    I1 = np.array([63.67, 29.315, 0.241, 0.063]) / 1000.0  # A
+    R_A = (V1 / I1) - R_li
+    dR_A = calculate_uncertainty_R_A(V1, I1, np.full(4, 0.005), np.array([0.18, 0.064, 0.051, 0.005]) / 1000.0,
+                                     np.array([0.25, 0.49, 59.0, 250.0]))
+    _, R_A_stats = grouped_weighted_mean(R_A, dR_A)
+    print(f"Plain mean R_A: {np.mean(R_A):.2f} ± {np.average(dR_A):.2f} Ω")
+    print(f"Weighted mean R_A: {R_A_stats['mean'][0]:.2f} ± {R_A_stats['sigma_scaled'][0]:.2f} Ω "
+          f"(Birge ratio {R_A_stats['birge_ratio'][0]:.2f})")
+
+    # Log of repeated readings keyed by instrument, range and resistor, with 1% outliers
+    rng = np.random.default_rng(0)
+    n = 2 * 10**6
+    instrument = rng.choice(np.array(['DMM-1', 'DMM-2', 'DMM-3']), n)
+    meter_range = rng.integers(0, 4, n)
+    resistor = rng.integers(0, 50, n)
+    true_value = 100.0 * (1 + resistor) * 10.0 ** meter_range
+    sigma = true_value * rng.uniform(1e-4, 1e-3, n)
+    values = true_value + rng.normal(0.0, 1.0, n) * sigma
+    values[rng.random(n) < 0.01] *= 1.05
+
+    keys, stats, kept = grouped_weighted_mean(values, sigma, instrument, meter_range, resistor,
+                                              clip=4.0, return_mask=True)
+    print(f"\n{len(stats)} groups, {np.count_nonzero(~kept)} readings clipped, "
+          f"median Birge ratio {np.median(stats['birge_ratio']):.3f}")
+
+    # Streaming over chunks gives the unclipped statistics without holding the whole log
+    accumulator = GroupedAccumulator(n_keys=3)
+    for start in range(0, n, 500000):
+        chunk = slice(start, start + 500000)
+        accumulator.update(values[chunk], sigma[chunk], instrument[chunk], meter_range[chunk], resistor[chunk])
+    _, streamed = accumulator.result()
+    _, direct = grouped_weighted_mean(values, sigma, instrument, meter_range, resistor)
+    print(f"Streaming vs in-memory largest relative mean difference: "
+          f"{np.max(np.abs(streamed['mean'] / direct['mean'] - 1)):.1e}")
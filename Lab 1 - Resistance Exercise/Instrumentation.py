@@ -0,0 +1,377 @@
+import functools
+import importlib
+import inspect
+import json
+import threading
+import time
+import tracemalloc
+import numpy as np
+from Function_Patching import rebind_functions, restore_functions
+
+# Lab 1 modules whose public functions and methods install() instruments
+LAB1_MODULES = ('Error_Propagation', 'Linear_Fitting', 'Resistance_Calc', 'Analysis_Error',
+                'Streaming_Fit', 'Uncertain_Array', 'Formula_Compiler', 'Monte_Carlo',
+                'Resampling', 'Grouped_Aggregation', 'Batch_Analysis')
+
+_enabled = False
+_trace_memory = False
+_started_tracemalloc = False
+_max_events = 10**6
+_records = {}
+_events = []
+_dropped_events = 0
+_local = threading.local()
+_installed = []
+
+def enable(memory=True, max_events=10**6):
+    """
+    Function Description:
+    Starts recording stages. While disabled, instrumented functions only pay for
+    one global flag check per call.
+
+    Parameters:
+    memory (bool): Also record bytes allocated per stage with tracemalloc (slower).
+    max_events (int): Maximum number of individual calls kept for the trace exports.
+    """
+    global _enabled, _trace_memory, _max_events, _started_tracemalloc
+    _trace_memory = memory
+    _max_events = max_events
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _enabled = True
+
+def disable():
+    """
+    Function Description:
+    Stops recording stages (the recorded data is kept until reset()). tracemalloc
+    is only stopped if enable() started it, so a caller's own tracing is left running.
+    """
+    global _enabled, _started_tracemalloc
+    _enabled = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """
+    Function Description:
+    Discards all recorded stage statistics and trace events.
+    """
+    global _dropped_events
+    _records.clear()
+    _events.clear()
+    _dropped_events = 0
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def _array_size(args, kwargs):
+    """
+    Function Description:
+    Total number of elements and bytes of the ndarray arguments of a call.
+    """
+    elements = nbytes = 0
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, np.ndarray):
+            elements += value.size
+            nbytes += value.nbytes
+    return elements, nbytes
+
+class _Frame:
+    """
+    Class Description:
+    One active stage: start time, child time and memory high-water mark.
+    """
+    __slots__ = ('name', 'start', 'child_time', 'memory_start', 'memory_peak', 'elements', 'nbytes')
+
+    def __init__(self, name, elements, nbytes):
+        self.name = name
+        self.elements = elements
+        self.nbytes = nbytes
+        self.child_time = 0.0
+        self.memory_start = self.memory_peak = 0
+
+    def __enter__(self):
+        stack = _stack()
+        if _trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory_start = current
+            if _started_tracemalloc:
+                # Hand the peak reached so far to the enclosing stage, then measure our own
+                if stack:
+                    stack[-1].memory_peak = max(stack[-1].memory_peak, peak)
+                tracemalloc.reset_peak()
+                self.memory_peak = current
+            else:
+                # The caller's tracing is not ours to reset; remember its peak instead
+                self.memory_peak = peak
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        elapsed = end - self.start
+        stack = _stack()
+        stack.pop()
+
+        allocated = retained = 0
+        if _trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if _started_tracemalloc:
+                peak = max(self.memory_peak, peak)
+                if stack:
+                    stack[-1].memory_peak = max(stack[-1].memory_peak, peak)
+                tracemalloc.reset_peak()
+            elif peak <= self.memory_peak:
+                # Without resets the stage's own peak is only seen if it raised the
+                # caller's; otherwise the memory it holds is the best (lower) bound
+                peak = max(current, self.memory_start)
+            allocated = peak - self.memory_start
+            retained = current - self.memory_start
+
+        if stack:
+            stack[-1].child_time += elapsed
+
+        record = _records.get(self.name)
+        if record is None:
+            record = _records[self.name] = {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0,
+                                            'max_seconds': 0.0, 'elements': 0, 'input_bytes': 0,
+                                            'peak_bytes': 0, 'retained_bytes': 0}
+        record['calls'] += 1
+        record['seconds'] += elapsed
+        record['self_seconds'] += elapsed - self.child_time
+        record['max_seconds'] = max(record['max_seconds'], elapsed)
+        record['elements'] += self.elements
+        record['input_bytes'] += self.nbytes
+        record['peak_bytes'] = max(record['peak_bytes'], allocated)
+        record['retained_bytes'] += retained
+
+        global _dropped_events
+        if len(_events) < _max_events:
+            _events.append((tuple(frame.name for frame in stack) + (self.name,), self.start, elapsed,
+                            elapsed - self.child_time, threading.get_ident(), self.elements, allocated))
+        else:
+            _dropped_events += 1
+        return False
+
+class _NullStage:
+    """
+    Class Description:
+    Context manager that does nothing, returned by stage() while disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name, *arrays):
+    """
+    Function Description:
+    Context manager recording one stage of a pipeline, e.g.
+
+        with stage('R_A propagation', V, I):
+            dR_A = calculate_uncertainty_R_A(V, I, dV, dI, dR_li)
+
+    Parameters:
+    name (str): Stage name; stages nest into call stacks.
+    *arrays (ndarray): Arrays whose sizes are recorded with the stage.
+
+    Returns:
+    context manager: Records the stage on exit (a shared no-op while disabled).
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Frame(name, *_array_size(arrays, {}))
+
+def instrument(func=None, name=None):
+    """
+    Function Description:
+    Decorator recording every call of a function as a stage named after it.
+
+    Parameters:
+    func (callable): Function to instrument (omit to use as @instrument(name=...)).
+    name (str): Stage name (default: module.qualified_name).
+
+    Returns:
+    callable: The instrumented function.
+    """
+    if func is None:
+        return lambda func: instrument(func, name)
+
+    stage_name = name or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with _Frame(stage_name, *_array_size(args, kwargs)):
+            return func(*args, **kwargs)
+
+    wrapper.__instrumented__ = func
+    return wrapper
+
+def _public_members(module):
+    """
+    Function Description:
+    Yields (namespace, attribute, function) for the public functions defined in a
+    module and the public methods of the classes defined in it.
+    """
+    for attribute, value in list(vars(module).items()):
+        if attribute.startswith('_') or getattr(value, '__module__', None) != module.__name__:
+            continue
+        if inspect.isfunction(value):
+            yield module, attribute, value
+        elif inspect.isclass(value):
+            for method_name, method in list(vars(value).items()):
+                if method_name.startswith('_'):
+                    continue
+                if isinstance(method, (staticmethod, classmethod)) or inspect.isfunction(method):
+                    yield value, method_name, method
+
+def install(modules=LAB1_MODULES):
+    """
+    Function Description:
+    Instruments every public function and method of the given modules in place.
+    Names bound elsewhere with 'from module import function' (in the Lab 1 modules
+    or any pipeline built on them) are rebound to the instrumented versions too.
+    Instrumentation only covers the current process, not process-pool workers.
+
+    Parameters:
+    modules (sequence): Module names or module objects (default: all Lab 1 modules).
+
+    Returns:
+    int: Number of functions instrumented.
+    """
+    replacements = {}
+    for module in modules:
+        if isinstance(module, str):
+            module = importlib.import_module(module)
+        for namespace, attribute, value in _public_members(module):
+            if isinstance(value, (staticmethod, classmethod)):
+                if hasattr(value.__func__, '__instrumented__'):
+                    continue
+                wrapped = type(value)(instrument(value.__func__))
+            elif hasattr(value, '__instrumented__'):
+                continue
+            else:
+                wrapped = instrument(value)
+                replacements[id(value)] = (value, wrapped)
+            setattr(namespace, attribute, wrapped)
+            _installed.append((namespace, attribute, value))
+
+    # Rebind names imported from the instrumented modules
+    rebind_functions(replacements, _installed)
+
+    return len(replacements)
+
+def uninstall():
+    """
+    Function Description:
+    Restores every function and name replaced by install().
+    """
+    restore_functions(_installed)
+
+def report():
+    """
+    Function Description:
+    Returns the recorded statistics of every stage, slowest first.
+
+    Returns:
+    dict: Dictionary mapping stage names to dictionaries with the keys calls, seconds,
+          self_seconds, max_seconds, elements, input_bytes, peak_bytes and retained_bytes.
+    """
+    return dict(sorted(_records.items(), key=lambda item: -item[1]['seconds']))
+
+def export_json(path):
+    """
+    Function Description:
+    Writes the stage statistics to a JSON file.
+    """
+    with open(path, 'w') as output:
+        json.dump({'stages': report(), 'dropped_events': _dropped_events}, output, indent=1)
+
+def export_chrome_trace(path):
+    """
+    Function Description:
+    Writes the recorded calls in the Chrome trace event format, which chrome://tracing,
+    Perfetto and speedscope display as a flame chart.
+    """
+    events = [{'name': names[-1], 'ph': 'X', 'ts': start * 1e6, 'dur': elapsed * 1e6,
+               'pid': 0, 'tid': thread, 'args': {'elements': elements, 'peak_bytes': allocated}}
+              for names, start, elapsed, _, thread, elements, allocated in _events]
+    with open(path, 'w') as output:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, output)
+
+def export_folded(path):
+    """
+    Function Description:
+    Writes folded stacks ('outer;inner self_microseconds' per line), the input format
+    of flamegraph.pl and speedscope.
+    """
+    folded = {}
+    for names, _, _, self_time, _, _, _ in _events:
+        key = ';'.join(names)
+        folded[key] = folded.get(key, 0.0) + self_time
+    with open(path, 'w') as output:
+        for key, self_time in sorted(folded.items()):
+            output.write(f"{key} {int(round(self_time * 1e6))}\n")
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from Benchmark_Suite import synthetic_measurements, _lab1_pipeline
+
+    data = synthetic_measurements(10**6, np.random.default_rng(0))
+
+    def noop(x):
+        return x
+
+    def best_per_call(funcs, repeats=7, number=100000):
+        # Loops of the functions alternate, so drifts of the machine speed hit all of
+        # them alike, and the best loop of each (warm, least disturbed) is kept
+        best = [float('inf')] * len(funcs)
+        for _ in range(repeats):
+            for i, func in enumerate(funcs):
+                start = time.perf_counter()
+                for _ in range(number):
+                    func(1.0)
+                best[i] = min(best[i], (time.perf_counter() - start) / number)
+        return best
+
+    # Disabled: the wrappers only check a flag
+    instrumented = install()
+    wrapped_time, bare_time = best_per_call([instrument(noop), noop])
+    print(f"{instrumented} functions instrumented; overhead while disabled: "
+          f"{(wrapped_time - bare_time) * 1e9:.0f} ns per call")
+
+    # Warm up first, so lazy imports (scipy, in chi2_survival) are not counted as analysis time
+    _lab1_pipeline(data)
+    enable()
+    with stage('lab1_pipeline', data['I']):
+        _lab1_pipeline(data)
+    disable()
+
+    print(f"\n{'stage':<55}{'calls':>6}{'total ms':>10}{'self ms':>10}{'peak MiB':>10}")
+    for name, record in report().items():
+        print(f"{name:<55}{record['calls']:>6}{record['seconds'] * 1e3:>10.2f}"
+              f"{record['self_seconds'] * 1e3:>10.2f}{record['peak_bytes'] / 2**20:>10.1f}")
+
+    output = tempfile.mkdtemp()
+    export_json(os.path.join(output, 'stages.json'))
+    export_chrome_trace(os.path.join(output, 'trace.json'))
+    export_folded(os.path.join(output, 'stacks.folded'))
+    print(f"\nExported stages.json, trace.json and stacks.folded to {output}")
+    uninstall()
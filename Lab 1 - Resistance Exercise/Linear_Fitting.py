@@ -1,7 +1,4 @@
-import matplotlib.pyplot as plt
 import numpy as np
-import scipy as scp
-import math
 
 def linear_fitter(x_inputs, y_inputs, y_uncertainties):
     """
@@ -47,23 +44,318 @@ def linear_fitter(x_inputs, y_inputs, y_uncertainties):
     reduced_chi_squared = chi_squared / degrees_of_freedom
     
     # Calculate p-value (probability that chi-squared could be this large by chance)
+    p_value = chi2_survival(chi_squared, degrees_of_freedom)[()]
+    
+    return (m, b, m_stdrd_dev, b_stdrd_dev, y_variance,
+            chi_squared, reduced_chi_squared, p_value, residuals)
+
+def chi2_survival(chi_squared, degrees_of_freedom):
+    """
+    Function Description:
+    Vectorized p-value (upper tail probability) of the chi-squared distribution.
+    Falls back to the same rough approximation as linear_fitter if scipy is missing.
+
+    Parameters:
+    chi_squared (array_like): Array of chi-squared values.
+    degrees_of_freedom (array_like): Array of degrees of freedom.
+
+    Returns:
+    array_like: Array of p-values.
+    """
+    chi_squared = np.asarray(chi_squared, dtype=float)
+    degrees_of_freedom = np.asarray(degrees_of_freedom, dtype=float)
+
     try:
-        from scipy.stats import chi2
-        p_value = 1 - chi2.cdf(chi_squared, degrees_of_freedom)
+        # scipy.special loads much faster than scipy.stats
+        from scipy.special import chdtrc
+        p_value = chdtrc(degrees_of_freedom, chi_squared)
     except ImportError:
         # Fallback approximation if scipy is not available
         p_value = np.exp(-chi_squared / 2)  # Rough approximation
-    
-    return (m, b, m_stdrd_dev, b_stdrd_dev, y_variance, 
-            chi_squared, reduced_chi_squared, p_value, residuals)
 
-import matplotlib.pyplot as plt
+    return np.where(degrees_of_freedom > 0, p_value, np.nan)
+
+def weighted_line_from_moments(W, x_mean, y_mean, Sxx, Sxy, Syy, N):
+    """
+    Function Description:
+    Calculates the weighted straight-line fit statistics from centred moments.
+    All sums are taken about the weighted means, which avoids the cancellation
+    in the N*dot(x,x) - sum(x)**2 form of delta.
+
+    Unlike linear_fitter, whose standard errors come from the residual scatter,
+    m_stdrd_dev and b_stdrd_dev here are propagated from the y uncertainties
+    (sqrt(1/Sxx) and sqrt(1/W + x_mean**2/Sxx)). Multiply them by
+    sqrt(reduced_chi_squared) to get linear_fitter's scatter-based errors.
+
+    Parameters:
+    W (array_like): Sum of weights (1 / sigma_y**2).
+    x_mean (array_like): Weighted mean of x.
+    y_mean (array_like): Weighted mean of y.
+    Sxx (array_like): Weighted sum of (x - x_mean)**2.
+    Sxy (array_like): Weighted sum of (x - x_mean) * (y - y_mean).
+    Syy (array_like): Weighted sum of (y - y_mean)**2.
+    N (array_like): Number of points in each fit.
+
+    Returns:
+    tuple: A tuple containing (m, b, m_stdrd_dev, b_stdrd_dev, chi_squared,
+            degrees_of_freedom, reduced_chi_squared, p_value)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = Sxy / Sxx
+        b = y_mean - m * x_mean
+
+        # Standard errors from the inverse of the weighted normal matrix
+        m_stdrd_dev = np.sqrt(1.0 / Sxx)
+        b_stdrd_dev = np.sqrt(1.0 / W + x_mean**2 / Sxx)
+
+        # sum(w * (dy - m*dx)**2) expanded in the centred moments
+        chi_squared = np.maximum(Syy - m * Sxy, 0.0)
+
+        degrees_of_freedom = np.asarray(N) - 2
+        reduced_chi_squared = np.where(degrees_of_freedom > 0,
+                                       chi_squared / degrees_of_freedom, np.nan)
+
+    p_value = chi2_survival(chi_squared, degrees_of_freedom)
+
+    return (m, b, m_stdrd_dev, b_stdrd_dev, chi_squared,
+            degrees_of_freedom, reduced_chi_squared, p_value)
+
+def ragged_to_padded(values, lengths=None, offsets=None, fill_value=0.0):
+    """
+    Function Description:
+    Packs a flat array holding several concatenated datasets into a 2-D
+    (datasets x points) array, padding the short rows with fill_value.
+
+    Parameters:
+    values (array_like): Flat array of concatenated datasets.
+    lengths (array_like): Number of points in each dataset.
+    offsets (array_like): Start index of each dataset, with the total length as
+                          the final entry (used if lengths is not given).
+    fill_value (float): Value used for padding.
+
+    Returns:
+    tuple: A tuple containing (padded, mask) where mask is True on real points.
+    """
+    values = np.asarray(values, dtype=float)
+
+    if lengths is None:
+        offsets = np.asarray(offsets, dtype=np.intp)
+        lengths = np.diff(offsets)
+        starts = offsets[:-1]
+    else:
+        lengths = np.asarray(lengths, dtype=np.intp)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    width = int(lengths.max()) if lengths.size else 0
+    packed_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Row and column of every element, without a Python loop per dataset
+    rows = np.repeat(np.arange(lengths.size), lengths)
+    cols = np.arange(rows.size) - np.repeat(packed_starts, lengths)
+    flat_index = np.repeat(starts, lengths) + cols
+
+    padded = np.full((lengths.size, width), fill_value)
+    padded[rows, cols] = values[flat_index]
+
+    mask = np.zeros((lengths.size, width), dtype=bool)
+    mask[rows, cols] = True
+
+    return padded, mask
+
+def batch_fit_dtype(width):
+    """
+    Function Description:
+    Structured dtype returned by batch_linear_fitter for fits of up to width points.
+    """
+    return np.dtype([
+        ('m', float), ('b', float),
+        ('m_stdrd_dev', float), ('b_stdrd_dev', float),
+        ('m_scaled_stdrd_dev', float), ('b_scaled_stdrd_dev', float),
+        ('y_variance', float),
+        ('chi_squared', float), ('reduced_chi_squared', float), ('p_value', float),
+        ('N', np.intp),
+        ('residuals', float, (width,)),
+    ])
+
+def batch_linear_fitter(x_inputs, y_inputs, y_uncertainties, lengths=None, offsets=None):
+    """
+    Function Description:
+    Performs inverse-variance weighted linear regression y = mx + b on many
+    datasets in one vectorized call.
+
+    m_stdrd_dev and b_stdrd_dev are propagated from the y uncertainties, so they
+    differ from linear_fitter's errors of the same name, which come from the residual
+    scatter. The m_scaled_stdrd_dev and b_scaled_stdrd_dev fields are those errors
+    scaled by sqrt(reduced_chi_squared). With uniform uncertainties they equal
+    linear_fitter's m_stdrd_dev and b_stdrd_dev, so use them when replacing a loop
+    over linear_fitter.
+
+    Parameters:
+    x_inputs (array_like): 2-D (datasets x points) array of x-values, or a flat
+                           array of concatenated datasets if lengths/offsets is given.
+    y_inputs (array_like): Array of y-values, same layout as x_inputs.
+    y_uncertainties (array_like): Array of uncertainties in y-values, same layout
+                                  as x_inputs (or broadcastable to it).
+    lengths (array_like): Optional number of points in each ragged dataset.
+    offsets (array_like): Optional start offsets of each ragged dataset, with the
+                          total length as the final entry.
+
+    Returns:
+    ndarray: Structured array with one record per dataset and the fields
+             (m, b, m_stdrd_dev, b_stdrd_dev, m_scaled_stdrd_dev,
+             b_scaled_stdrd_dev, y_variance, chi_squared, reduced_chi_squared,
+             p_value, N, residuals). m/b_stdrd_dev are the sigma-based errors and
+             m/b_scaled_stdrd_dev the scatter-based ones, as in linear_fitter.
+             Residuals of padded points are NaN.
+    """
+    if lengths is None and offsets is None:
+        x = np.atleast_2d(np.asarray(x_inputs, dtype=float))
+        y = np.atleast_2d(np.asarray(y_inputs, dtype=float))
+        sigma = np.broadcast_to(np.asarray(y_uncertainties, dtype=float), y.shape)
+        mask = np.ones(y.shape, dtype=bool)
+    else:
+        x, mask = ragged_to_padded(x_inputs, lengths, offsets)
+        y, _ = ragged_to_padded(y_inputs, lengths, offsets)
+        sigma_flat = np.broadcast_to(np.asarray(y_uncertainties, dtype=float),
+                                     np.shape(x_inputs))
+        sigma, _ = ragged_to_padded(sigma_flat, lengths, offsets, fill_value=1.0)
+
+    # Inverse-variance weights, zero on padding
+    w = np.where(mask, 1.0 / sigma**2, 0.0)
+
+    N = mask.sum(axis=1)
+    W = w.sum(axis=1)
+    x_mean = np.einsum('ij,ij->i', w, x) / W
+    y_mean = np.einsum('ij,ij->i', w, y) / W
+
+    dx = x - x_mean[:, None]
+    dy = y - y_mean[:, None]
+    wdx = w * dx
+
+    Sxx = np.einsum('ij,ij->i', wdx, dx)
+    Sxy = np.einsum('ij,ij->i', wdx, dy)
+    Syy = np.einsum('ij,ij->i', w * dy, dy)
+
+    (m, b, m_stdrd_dev, b_stdrd_dev, chi_squared,
+     degrees_of_freedom, reduced_chi_squared, p_value) = weighted_line_from_moments(
+        W, x_mean, y_mean, Sxx, Sxy, Syy, N)
+
+    # Residuals about the weighted fit, NaN on padding
+    residuals = dy - m[:, None] * dx
+    residuals[~mask] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_variance = np.sqrt(np.nansum(residuals**2, axis=1) / degrees_of_freedom)
+
+    results = np.empty(N.shape[0], dtype=batch_fit_dtype(y.shape[1]))
+    results['m'] = m
+    results['b'] = b
+    results['m_stdrd_dev'] = m_stdrd_dev
+    results['b_stdrd_dev'] = b_stdrd_dev
+    results['m_scaled_stdrd_dev'] = m_stdrd_dev * np.sqrt(reduced_chi_squared)
+    results['b_scaled_stdrd_dev'] = b_stdrd_dev * np.sqrt(reduced_chi_squared)
+    results['y_variance'] = y_variance
+    results['chi_squared'] = chi_squared
+    results['reduced_chi_squared'] = reduced_chi_squared
+    results['p_value'] = p_value
+    results['N'] = N
+    results['residuals'] = residuals
+
+    return results
+
+def york_fitter(x_inputs, y_inputs, x_uncertainties, y_uncertainties, xy_correlation=0.0,
+                tolerance=1e-12, max_iterations=100):
+    """
+    Function Description:
+    Fits y = mx + b with uncertainties in both x and y (York et al. 2004 errors-in-variables
+    method), optionally with correlated x-y errors. Accepts 2-D (datasets x points)
+    arrays and iterates all datasets together, masking out the ones that have converged.
+
+    Parameters:
+    x_inputs (array_like): Array of x-values (independent variable).
+    y_inputs (array_like): Array of y-values (dependent variable).
+    x_uncertainties (array_like): Array of uncertainties in x-values.
+    y_uncertainties (array_like): Array of uncertainties in y-values.
+    xy_correlation (array_like): Correlation coefficient between the x and y errors.
+    tolerance (float): Relative change in slope at which a dataset has converged.
+    max_iterations (int): Maximum number of iterations.
+
+    Returns:
+    tuple: A tuple containing (m, b, m_stdrd_dev, b_stdrd_dev, y_variance,
+            chi_squared, reduced_chi_squared, p_value, residuals), with one
+            entry per dataset for 2-D inputs.
+    """
+    single = np.ndim(x_inputs) == 1
+    x = np.atleast_2d(np.asarray(x_inputs, dtype=float))
+    y = np.atleast_2d(np.asarray(y_inputs, dtype=float))
+    sigma_x = np.broadcast_to(np.asarray(x_uncertainties, dtype=float), x.shape)
+    sigma_y = np.broadcast_to(np.asarray(y_uncertainties, dtype=float), y.shape)
+    r = np.broadcast_to(np.asarray(xy_correlation, dtype=float), x.shape)
+    # Written with variances rather than York's omega = 1/sigma**2, so exact x-values
+    # (sigma_x = 0) keep finite weights and reduce to the weighted fit
+    variance_x = sigma_x**2
+    variance_y = sigma_y**2
+    covariance_xy = r * sigma_x * sigma_y
+    N = x.shape[1]
+
+    def weighted_terms(rows, m):
+        # York weights, weighted means and centred values for the given datasets
+        W = 1.0 / (variance_y[rows] + m[:, None]**2 * variance_x[rows] - 2 * m[:, None] * covariance_xy[rows])
+        X_bar = np.einsum('ij,ij->i', W, x[rows]) / W.sum(axis=1)
+        Y_bar = np.einsum('ij,ij->i', W, y[rows]) / W.sum(axis=1)
+        U = x[rows] - X_bar[:, None]
+        V = y[rows] - Y_bar[:, None]
+        beta = W * (U * variance_y[rows] + m[:, None] * V * variance_x[rows]
+                    - (m[:, None] * U + V) * covariance_xy[rows])
+        return W, X_bar, Y_bar, U, V, beta
+
+    # Start from the unweighted least-squares slope
+    dx = x - x.mean(axis=1, keepdims=True)
+    m = np.einsum('ij,ij->i', dx, y) / np.einsum('ij,ij->i', dx, dx)
+
+    active = np.arange(x.shape[0])
+    for _ in range(max_iterations):
+        W, X_bar, Y_bar, U, V, beta = weighted_terms(active, m[active])
+        m_new = np.einsum('ij,ij->i', W * beta, V) / np.einsum('ij,ij->i', W * beta, U)
+        converged = np.abs(m_new - m[active]) <= tolerance * np.abs(m_new)
+        m[active] = m_new
+        active = active[~converged]
+        if active.size == 0:
+            break
+
+    all_rows = np.arange(x.shape[0])
+    W, X_bar, Y_bar, U, V, beta = weighted_terms(all_rows, m)
+    b = Y_bar - m * X_bar
+
+    # Standard errors from the adjusted x-values
+    W_sum = W.sum(axis=1)
+    x_adjusted = X_bar[:, None] + beta
+    x_adjusted_mean = np.einsum('ij,ij->i', W, x_adjusted) / W_sum
+    u = x_adjusted - x_adjusted_mean[:, None]
+    m_stdrd_dev = np.sqrt(1.0 / np.einsum('ij,ij->i', W, u * u))
+    b_stdrd_dev = np.sqrt(1.0 / W_sum + x_adjusted_mean**2 * m_stdrd_dev**2)
+
+    residuals = y - (m[:, None] * x + b[:, None])
+    degrees_of_freedom = N - 2
+    y_variance = np.sqrt(np.sum(residuals**2, axis=1) / degrees_of_freedom)
+    chi_squared = np.einsum('ij,ij->i', W, residuals**2)
+    reduced_chi_squared = chi_squared / degrees_of_freedom
+    p_value = chi2_survival(chi_squared, degrees_of_freedom)
+
+    results = (m, b, m_stdrd_dev, b_stdrd_dev, y_variance,
+               chi_squared, reduced_chi_squared, p_value, residuals)
+    if single:
+        return tuple(value[0] for value in results)
+    return results
 
 def plot_V_vs_I(I_data, V_data, I_unc, V_unc, m, b, residuals, circuit_name):
     """
     Function Description:
     Plot V vs I with linear fit and residuals side-by-side
     """
+    # Imported here so fitting-only runs do not pay for matplotlib
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
     
     # Convert back to mA for better plotting
@@ -100,6 +392,7 @@ def plot_V_vs_I(I_data, V_data, I_unc, V_unc, m, b, residuals, circuit_name):
     return fig
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
     "Circuit Option 1 Values"
     V1 = np.array([6.498, 6.500, 6.501, 6.501])  # V
@@ -0,0 +1,319 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+class QuantileSketch:
+    """
+    Class Description:
+    Mergeable streaming quantile estimator with bounded relative error (log-spaced
+    buckets, as in DDSketch). Keeps one sketch per output element; bucket keys are
+    ordered like the values, so quantiles come from a cumulative count.
+
+    Parameters:
+    n_elements (int): Number of independent output elements.
+    relative_accuracy (float): Relative error of the quantile estimates.
+    """
+
+    # Magnitudes below this go to the zero bucket
+    MIN_VALUE = 1e-300
+
+    def __init__(self, n_elements, relative_accuracy=0.005):
+        self.n_elements = n_elements
+        self.relative_accuracy = relative_accuracy
+        self.log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy))
+
+        # Largest bucket index magnitude needed for any finite float
+        self.offset = int(np.ceil(np.log(np.finfo(float).max) / self.log_gamma)) + 1
+        self.stride = 4 * self.offset + 3
+
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def _merge_keys(self, keys, counts):
+        keys = np.concatenate((self.keys, keys))
+        counts = np.concatenate((self.counts, counts))
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=self.keys.size).astype(np.int64)
+
+    def add(self, samples, mask=None):
+        """
+        Function Description:
+        Adds a (samples x elements) array of values to the sketch, skipping the
+        entries where mask is False.
+        """
+        samples = np.where(mask, samples, 0.0) if mask is not None else samples
+        magnitude = np.abs(samples)
+        with np.errstate(divide='ignore'):
+            index = np.ceil(np.log(magnitude) / self.log_gamma)
+        index = np.clip(np.nan_to_num(index, neginf=-self.offset), -self.offset, self.offset)
+
+        # Signed key ordered like the value, zero bucket at 0
+        key = np.where(magnitude < self.MIN_VALUE, 0,
+                       np.sign(samples) * (index + self.offset + 1)).astype(np.int64)
+        key += 2 * self.offset + 1
+        key += np.arange(self.n_elements, dtype=np.int64) * self.stride
+
+        if mask is not None:
+            key = key[mask]
+
+        keys, counts = np.unique(key, return_counts=True)
+        self._merge_keys(keys, counts)
+
+    def merge(self, other):
+        """
+        Function Description:
+        Merges another sketch with the same settings into this one.
+        """
+        self._merge_keys(other.keys, other.counts)
+        return self
+
+    def quantiles(self, q):
+        """
+        Function Description:
+        Estimates the quantiles q (between 0 and 1) of every element.
+
+        Returns:
+        ndarray: Array of shape (len(q), n_elements).
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        element = self.keys // self.stride
+        cumulative = np.cumsum(self.counts)
+
+        # Count before each element's first bucket and total per element
+        totals = np.bincount(element, weights=self.counts, minlength=self.n_elements)
+        before = np.concatenate(([0], np.cumsum(totals)[:-1]))
+
+        rank = before[None, :] + np.floor(q[:, None] * np.maximum(totals - 1, 0)[None, :])
+        position = np.searchsorted(cumulative, rank, side='right')
+        position = np.minimum(position, self.keys.size - 1)
+
+        key = self.keys[position] - element[position] * self.stride - (2 * self.offset + 1)
+        index = np.abs(key) - self.offset - 1
+        value = np.sign(key) * 2.0 * np.exp(index * self.log_gamma) / (1.0 + np.exp(self.log_gamma))
+
+        return np.where(totals[None, :] > 0, value, np.nan)
+
+class _RunningMoments:
+    """
+    Class Description:
+    Mergeable count, mean, second central moment, minimum and maximum per element.
+    """
+
+    def __init__(self, n_elements):
+        self.n = np.zeros(n_elements)
+        self.mean = np.zeros(n_elements)
+        self.M2 = np.zeros(n_elements)
+        self.min = np.full(n_elements, np.inf)
+        self.max = np.full(n_elements, -np.inf)
+
+    def add(self, samples, finite):
+        n = finite.sum(axis=0).astype(float)
+        masked = np.where(finite, samples, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n > 0, masked.sum(axis=0) / n, 0.0)
+        M2 = (np.where(finite, samples - mean, 0.0) ** 2).sum(axis=0)
+        self._merge(n, mean, M2,
+                    np.where(finite, samples, np.inf).min(axis=0),
+                    np.where(finite, samples, -np.inf).max(axis=0))
+
+    def _merge(self, n, mean, M2, minimum, maximum):
+        total = self.n + n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(total > 0, n / total, 0.0)
+        delta = mean - self.mean
+        self.M2 = self.M2 + M2 + delta**2 * self.n * fraction
+        self.mean = self.mean + delta * fraction
+        self.n = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+
+    def merge(self, other):
+        self._merge(other.n, other.mean, other.M2, other.min, other.max)
+        return self
+
+def _draw_inputs(rng, size, means, sigmas, covariance):
+    """
+    Function Description:
+    Draws normally distributed input samples of shape (*input shape, size); the
+    sample axis is last so that scalar and array inputs broadcast together.
+    """
+    if covariance is not None:
+        draws = rng.multivariate_normal(np.ravel(means), covariance, size=size)
+        return [draws[:, i] for i in range(draws.shape[1])]
+
+    inputs = []
+    for mean, sigma in zip(means, sigmas):
+        shape = np.broadcast_shapes(np.shape(mean), np.shape(sigma))
+        inputs.append(np.asarray(mean)[..., None]
+                      + np.asarray(sigma)[..., None] * rng.standard_normal(shape + (size,)))
+    return inputs
+
+def _evaluate(func, inputs, extra_args, output):
+    """
+    Function Description:
+    Calls the formula and selects its value output (e.g. the first element of a
+    (value, uncertainty) tuple).
+    """
+    result = func(*inputs, *extra_args)
+    if isinstance(result, tuple):
+        result = result[output]
+    return np.asarray(result, dtype=float)
+
+def _run_chunk(task):
+    """
+    Function Description:
+    Evaluates one chunk of samples and reduces it to mergeable partial statistics.
+    Runs in a worker process.
+    """
+    (func, means, sigmas, covariance, extra_args, output,
+     size, seed, edges, relative_accuracy) = task
+
+    rng = np.random.default_rng(seed)
+    samples = _evaluate(func, _draw_inputs(rng, size, means, sigmas, covariance), extra_args, output)
+    out_shape = samples.shape[:-1]
+    samples = samples.reshape(-1, size).T
+    n_elements = samples.shape[1]
+
+    finite = np.isfinite(samples)
+    moments = _RunningMoments(n_elements)
+    moments.add(samples, finite)
+
+    sketch = QuantileSketch(n_elements, relative_accuracy)
+    sketch.add(samples, finite)
+
+    # Fixed-edge histogram with underflow and overflow counts
+    bins = edges.shape[1] - 1
+    lo = edges[:, 0]
+    hi = edges[:, -1]
+    with np.errstate(invalid='ignore'):
+        position = np.floor((samples - lo) / (hi - lo) * bins)
+    position = np.where(finite, np.clip(position, -1, bins), bins + 1).astype(np.int64) + 1
+    position += np.arange(n_elements) * (bins + 3)
+    counts = np.bincount(position.ravel(), minlength=n_elements * (bins + 3)).reshape(n_elements, bins + 3)
+
+    return moments, sketch, counts, (~finite).sum(axis=0), out_shape
+
+def monte_carlo_propagate(func, means, sigmas=None, n_samples=10**6, chunk_size=10**5,
+                          n_workers=1, seed=None, percentiles=(2.5, 16.0, 50.0, 84.0, 97.5),
+                          bins=100, hist_range=None, covariance=None, extra_args=(),
+                          output=0, relative_accuracy=0.005):
+    """
+    Function Description:
+    Propagates uncertainty through a vectorized formula by Monte Carlo sampling.
+    Samples are drawn in fixed-size chunks so memory stays bounded, chunks can be
+    spread over a process pool, and every chunk has its own seed spawned from seed,
+    so results do not depend on the number of workers.
+
+    Parameters:
+    func (callable): Vectorized formula called as func(*input_samples, *extra_args). If it
+                     returns a tuple, e.g. (value, uncertainty) as calculate_uncertainty_R1
+                     does, element [output] is used. Must be picklable (defined at
+                     module level) when n_workers > 1.
+    means (sequence): Mean value of each input (scalars or arrays). Samples are passed
+                      with an extra last axis of length chunk_size.
+    sigmas (sequence): Uncertainty of each input (independent normal inputs).
+    n_samples (int): Total number of samples.
+    chunk_size (int): Number of samples evaluated at once.
+    n_workers (int): Number of worker processes (1 runs in this process).
+    seed (int): Seed for reproducible results.
+    percentiles (sequence): Percentiles (0-100) to estimate.
+    bins (int): Number of histogram bins.
+    hist_range (tuple): (low, high) histogram range; estimated from a pilot run if None.
+    covariance (array_like): Optional (k, k) covariance of scalar inputs, used instead of sigmas.
+    extra_args (tuple): Extra positional arguments passed to func after the samples.
+    output (int): Index of the value in a tuple returned by func.
+    relative_accuracy (float): Relative error of the percentile estimates.
+
+    Returns:
+    dict: Dictionary with mean, std, min, max, percentiles, histogram counts and
+          edges (with underflow/overflow counts), n_samples and n_nonfinite.
+    """
+    n_chunks = -(-n_samples // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks + 1)
+    if sigmas is None:
+        sigmas = [None] * len(means)
+
+    # Histogram edges from a small pilot run if no range is given
+    pilot = _evaluate(func, _draw_inputs(np.random.default_rng(seeds[-1]), min(chunk_size, 10**4),
+                                         means, sigmas, covariance), extra_args, output)
+    pilot = pilot.reshape(-1, pilot.shape[-1]).T
+    if hist_range is None:
+        lo = np.nanpercentile(np.where(np.isfinite(pilot), pilot, np.nan), 0.5, axis=0)
+        hi = np.nanpercentile(np.where(np.isfinite(pilot), pilot, np.nan), 99.5, axis=0)
+    else:
+        lo = np.full(pilot.shape[1], float(hist_range[0]))
+        hi = np.full(pilot.shape[1], float(hist_range[1]))
+    hi = np.where(hi > lo, hi, lo + 1.0)
+    edges = lo[:, None] + (hi - lo)[:, None] * np.linspace(0.0, 1.0, bins + 1)[None, :]
+
+    tasks = [(func, means, sigmas, covariance, extra_args, output,
+              min(chunk_size, n_samples - i * chunk_size), seeds[i], edges, relative_accuracy)
+             for i in range(n_chunks)]
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            partials = executor.map(_run_chunk, tasks)
+            combined = _reduce(partials, pilot.shape[1], bins, relative_accuracy)
+    else:
+        combined = _reduce(map(_run_chunk, tasks), pilot.shape[1], bins, relative_accuracy)
+
+    moments, sketch, counts, n_nonfinite, out_shape = combined
+    q = np.asarray(percentiles, dtype=float) / 100.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(moments.M2 / (moments.n - 1))
+
+    return {
+        'mean': moments.mean.reshape(out_shape),
+        'std': std.reshape(out_shape),
+        'min': moments.min.reshape(out_shape),
+        'max': moments.max.reshape(out_shape),
+        'percentiles': dict(zip(percentiles, (row.reshape(out_shape) for row in sketch.quantiles(q)))),
+        'histogram': counts[:, 1:-2].reshape(out_shape + (bins,)),
+        'edges': edges.reshape(out_shape + (bins + 1,)),
+        'underflow': counts[:, 0].reshape(out_shape),
+        'overflow': counts[:, -2].reshape(out_shape),
+        'n_samples': n_samples,
+        'n_nonfinite': n_nonfinite.reshape(out_shape),
+    }
+
+def _reduce(partials, n_elements, bins, relative_accuracy):
+    """
+    Function Description:
+    Merges the partial statistics of all chunks as they arrive.
+    """
+    moments = _RunningMoments(n_elements)
+    sketch = QuantileSketch(n_elements, relative_accuracy)
+    counts = np.zeros((n_elements, bins + 3), dtype=np.int64)
+    n_nonfinite = np.zeros(n_elements, dtype=np.int64)
+    out_shape = None
+
+    for chunk_moments, chunk_sketch, chunk_counts, chunk_nonfinite, chunk_shape in partials:
+        moments.merge(chunk_moments)
+        sketch.merge(chunk_sketch)
+        counts += chunk_counts
+        n_nonfinite += chunk_nonfinite
+        out_shape = chunk_shape
+
+    return moments, sketch, counts, n_nonfinite, out_shape
+
+if __name__ == "__main__":
+    from Analysis_Error import calculate_uncertainty_R1
+    import time
+
+    # Values from the Resistance_Calc / Analysis_Error examples: dR_V is ~70x R_V
+    R_V, dR_V = 6.31e6, 4.62e8
+    m1, dm1 = -0.046, 0.004
+
+    R1, R1_error = calculate_uncertainty_R1(R_V, m1, dR_V, dm1)
+    print(f"First-order: R1 = {R1:.4e} ± {abs(R1_error):.4e}")
+
+    start = time.perf_counter()
+    result = monte_carlo_propagate(calculate_uncertainty_R1, means=(R_V, m1), sigmas=(dR_V, dm1),
+                                   extra_args=(dR_V, dm1), n_samples=10**7, chunk_size=10**6,
+                                   n_workers=4, seed=293)
+    elapsed = time.perf_counter() - start
+
+    print(f"Monte Carlo ({result['n_samples']:.0e} samples, {elapsed:.1f} s):")
+    print(f"  mean = {result['mean']:.4e}, std = {result['std']:.4e}")
+    for p, value in result['percentiles'].items():
+        print(f"  {p:5.1f}th percentile = {value:.4e}")
@@ -0,0 +1,221 @@
+from concurrent.futures import ProcessPoolExecutor
+from Linear_Fitting import batch_linear_fitter
+import numpy as np
+
+def bootstrap_indices(rng, n_resamples, n_points, n_datasets=1):
+    """
+    Function Description:
+    Generates bootstrap resample index matrices (sampling points with replacement).
+
+    Parameters:
+    rng (Generator): NumPy random generator.
+    n_resamples (int): Number of bootstrap replicates.
+    n_points (int): Number of points in each dataset.
+    n_datasets (int): Number of datasets.
+
+    Returns:
+    ndarray: Integer array of shape (n_datasets, n_resamples, n_points).
+    """
+    return rng.integers(0, n_points, size=(n_datasets, n_resamples, n_points))
+
+def indices_to_counts(indices, n_points):
+    """
+    Function Description:
+    Converts resample index matrices into per-point multiplicities, so each replicate
+    becomes a weighted fit of the original points instead of a gathered copy.
+
+    Parameters:
+    indices (ndarray): Integer array of shape (..., n_points_drawn).
+    n_points (int): Number of points in each dataset.
+
+    Returns:
+    ndarray: Array of shape (..., n_points) with the number of times each point was drawn.
+    """
+    rows = indices.reshape(-1, indices.shape[-1])
+    flat = rows + (np.arange(rows.shape[0]) * n_points)[:, None]
+    counts = np.bincount(flat.ravel(), minlength=rows.shape[0] * n_points)
+    return counts.reshape(indices.shape[:-1] + (n_points,)).astype(float)
+
+def resampled_fits(x_inputs, y_inputs, weights, multiplicities):
+    """
+    Function Description:
+    Evaluates many weighted straight-line fits at once, one per row of multiplicities.
+
+    Parameters:
+    x_inputs (ndarray): Array of x-values, shape (datasets, points).
+    y_inputs (ndarray): Array of y-values, shape (datasets, points).
+    weights (ndarray): Inverse-variance weights, shape (datasets, points).
+    multiplicities (ndarray): Point multiplicities, shape (datasets, replicates, points).
+
+    Returns:
+    tuple: A tuple containing (m, b), each of shape (datasets, replicates).
+    """
+    w = multiplicities * weights[:, None, :]
+    x = x_inputs[:, None, :]
+    y = y_inputs[:, None, :]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        W = w.sum(axis=-1)
+        x_mean = np.einsum('drn,dn->dr', w, x_inputs) / W
+        y_mean = np.einsum('drn,dn->dr', w, y_inputs) / W
+
+        dx = x - x_mean[..., None]
+        wdx = w * dx
+        Sxx = np.einsum('drn,drn->dr', wdx, dx)
+        Sxy = np.einsum('drn,drn->dr', wdx, y - y_mean[..., None])
+
+        m = Sxy / Sxx
+        b = y_mean - m * x_mean
+
+    # Resamples drawing fewer than two distinct points have no defined slope
+    degenerate = ((multiplicities > 0).sum(axis=-1) < 2) | ~(Sxx > 0)
+    m[degenerate] = np.nan
+    b[degenerate] = np.nan
+
+    return m, b
+
+def _bootstrap_shard(task):
+    """
+    Function Description:
+    Runs a shard of bootstrap replicates in chunks. Runs in a worker process.
+    """
+    x, y, w, n_resamples, seed, chunk_size = task
+    rng = np.random.default_rng(seed)
+    n_datasets, n_points = x.shape
+
+    m = np.empty((n_datasets, n_resamples))
+    b = np.empty((n_datasets, n_resamples))
+    for start in range(0, n_resamples, chunk_size):
+        stop = min(start + chunk_size, n_resamples)
+        indices = bootstrap_indices(rng, stop - start, n_points, n_datasets)
+        m[:, start:stop], b[:, start:stop] = resampled_fits(x, y, w, indices_to_counts(indices, n_points))
+
+    return m, b
+
+def _prepare(x_inputs, y_inputs, y_uncertainties):
+    """
+    Function Description:
+    Converts inputs to 2-D (datasets x points) arrays and inverse-variance weights.
+    """
+    x = np.atleast_2d(np.asarray(x_inputs, dtype=float))
+    y = np.atleast_2d(np.asarray(y_inputs, dtype=float))
+    sigma = np.broadcast_to(np.asarray(y_uncertainties, dtype=float), y.shape)
+    return x, y, 1.0 / sigma**2
+
+def bootstrap_linear_fitter(x_inputs, y_inputs, y_uncertainties, n_resamples=10000,
+                            confidence=0.6827, seed=None, chunk_size=None, n_workers=1,
+                            return_replicates=False):
+    """
+    Function Description:
+    Bootstrap (resampling points with replacement) errors and percentile confidence
+    intervals for the weighted straight-line fit of many datasets. All replicates are
+    evaluated as batched weighted regressions; replicates can be sharded across
+    processes, each with its own seed spawned from seed.
+
+    Parameters:
+    x_inputs (array_like): Array of x-values, 1-D or 2-D (datasets x points).
+    y_inputs (array_like): Array of y-values.
+    y_uncertainties (array_like): Array of uncertainties in y-values.
+    n_resamples (int): Number of bootstrap replicates per dataset.
+    confidence (float): Confidence level of the percentile intervals.
+    seed (int): Seed for reproducible results.
+    chunk_size (int): Replicates evaluated at once (default keeps ~10^7 elements per chunk).
+    n_workers (int): Number of worker processes (1 runs in this process).
+    return_replicates (bool): Also return the (datasets x replicates) m and b arrays.
+
+    Returns:
+    ndarray: Structured array with one record per dataset and the fields (m, b,
+             m_stdrd_dev, b_stdrd_dev, m_low, m_high, b_low, b_high, n_degenerate);
+             followed by (m_replicates, b_replicates) if return_replicates is True.
+    """
+    x, y, w = _prepare(x_inputs, y_inputs, y_uncertainties)
+    n_datasets, n_points = x.shape
+
+    if chunk_size is None:
+        chunk_size = max(1, 10**7 // (n_datasets * n_points))
+
+    # One seed per shard, so results only depend on seed and n_workers
+    shard_sizes = np.diff(np.linspace(0, n_resamples, max(n_workers, 1) + 1).astype(int))
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    tasks = [(x, y, w, int(size), shard_seed, chunk_size)
+             for size, shard_seed in zip(shard_sizes, seeds) if size > 0]
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            shards = list(executor.map(_bootstrap_shard, tasks))
+    else:
+        shards = [_bootstrap_shard(task) for task in tasks]
+
+    m_replicates = np.concatenate([shard[0] for shard in shards], axis=1)
+    b_replicates = np.concatenate([shard[1] for shard in shards], axis=1)
+
+    fit = batch_linear_fitter(x, y, np.sqrt(1.0 / w))
+    tail = 100.0 * (1.0 - confidence) / 2.0
+
+    results = np.empty(n_datasets, dtype=[
+        ('m', float), ('b', float), ('m_stdrd_dev', float), ('b_stdrd_dev', float),
+        ('m_low', float), ('m_high', float), ('b_low', float), ('b_high', float),
+        ('n_degenerate', np.intp)])
+    results['m'] = fit['m']
+    results['b'] = fit['b']
+    results['m_stdrd_dev'] = np.nanstd(m_replicates, axis=1, ddof=1)
+    results['b_stdrd_dev'] = np.nanstd(b_replicates, axis=1, ddof=1)
+    results['m_low'], results['m_high'] = np.nanpercentile(m_replicates, [tail, 100.0 - tail], axis=1)
+    results['b_low'], results['b_high'] = np.nanpercentile(b_replicates, [tail, 100.0 - tail], axis=1)
+    results['n_degenerate'] = np.isnan(m_replicates).sum(axis=1)
+
+    if return_replicates:
+        return results, m_replicates, b_replicates
+    return results
+
+def jackknife_linear_fitter(x_inputs, y_inputs, y_uncertainties):
+    """
+    Function Description:
+    Leave-one-out jackknife estimates and errors for the weighted straight-line fit of
+    many datasets, with all N leave-one-out fits evaluated at once.
+
+    Parameters:
+    x_inputs (array_like): Array of x-values, 1-D or 2-D (datasets x points).
+    y_inputs (array_like): Array of y-values.
+    y_uncertainties (array_like): Array of uncertainties in y-values.
+
+    Returns:
+    ndarray: Structured array with one record per dataset and the fields (m, b,
+             m_stdrd_dev, b_stdrd_dev) where m and b are bias-corrected.
+    """
+    x, y, w = _prepare(x_inputs, y_inputs, y_uncertainties)
+    n_datasets, n_points = x.shape
+
+    # Row i of the multiplicities leaves point i out
+    leave_one_out = np.broadcast_to(1.0 - np.eye(n_points), (n_datasets, n_points, n_points))
+    m_i, b_i = resampled_fits(x, y, w, leave_one_out)
+
+    fit = batch_linear_fitter(x, y, np.sqrt(1.0 / w))
+    factor = (n_points - 1) / n_points
+
+    results = np.empty(n_datasets, dtype=[
+        ('m', float), ('b', float), ('m_stdrd_dev', float), ('b_stdrd_dev', float)])
+    results['m'] = n_points * fit['m'] - (n_points - 1) * np.nanmean(m_i, axis=1)
+    results['b'] = n_points * fit['b'] - (n_points - 1) * np.nanmean(b_i, axis=1)
+    results['m_stdrd_dev'] = np.sqrt(factor * np.nansum((m_i - np.nanmean(m_i, axis=1, keepdims=True))**2, axis=1))
+    results['b_stdrd_dev'] = np.sqrt(factor * np.nansum((b_i - np.nanmean(b_i, axis=1, keepdims=True))**2, axis=1))
+
+    return results
+
+if __name__ == "__main__":
+    "Circuit Option 1 and 2 Values from Linear_Fitting"
+    V = np.array([[6.498, 6.500, 6.501, 6.501],
+                  [6.386, 6.448, 6.501, 6.501]])  # V
+    delta_V = np.full(V.shape, 0.005)  # V
+    I = np.array([[63.67, 29.315, 0.241, 0.063],
+                  [63.60, 29.322, 0.243, 0.065]]) / 1000.0  # A
+
+    boot = bootstrap_linear_fitter(I, V, delta_V, n_resamples=100000, seed=293)
+    jack = jackknife_linear_fitter(I, V, delta_V)
+
+    for circuit in range(2):
+        print(f"CIRCUIT {circuit + 1}")
+        print(f"Bootstrap slope: {boot['m'][circuit]:.3f} ± {boot['m_stdrd_dev'][circuit]:.3f} Ω "
+              f"(68% CI {boot['m_low'][circuit]:.3f} to {boot['m_high'][circuit]:.3f}, "
+              f"{boot['n_degenerate'][circuit]} degenerate resamples)")
+        print(f"Jackknife slope: {jack['m'][circuit]:.3f} ± {jack['m_stdrd_dev'][circuit]:.3f} Ω")
@@ -122,5 +122,12 @@ if __name__ == "__main__":
     print(f"\nAverage dR_A: {dR_A_avg:.1f} Ω")
     print(f"Average dR_V: {dR_V_avg:.1f} Ω")
 
+    # Inverse-variance weighted averages account for the very different uncertainties
+    from Grouped_Aggregation import grouped_weighted_mean
+    _, R_A_stats = grouped_weighted_mean(R_A, dR_A)
+    _, R_V_stats = grouped_weighted_mean(R_V, dR_V)
+    print(f"\nWeighted R_A: {R_A_stats['mean'][0]:.1f} ± {R_A_stats['sigma_scaled'][0]:.1f} Ω")
+    print(f"Weighted R_V: {R_V_stats['mean'][0]:.4e} ± {R_V_stats['sigma_scaled'][0]:.1e} Ω")
+
 
 
@@ -0,0 +1,470 @@
+import functools
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import sysconfig
+import tempfile
+import time
+from collections import OrderedDict
+import numpy as np
+from Function_Patching import rebind_functions, restore_functions
+
+# Functions memoized by install(), per module
+CACHED_FUNCTIONS = {
+    'Error_Propagation': ('multiplication', 'addition'),
+    'Linear_Fitting': ('linear_fitter', 'batch_linear_fitter', 'york_fitter'),
+    'Resistance_Calc': ('calculate_uncertainty_R_A', 'calculate_uncertainty_R_V'),
+    'Analysis_Error': ('calculate_uncertainty_R1', 'calculate_uncertainty_R2'),
+}
+
+# File extensions of the on-disk cache entries and of entries being written
+ENTRY_SUFFIX = '.pkl'
+TEMPORARY_SUFFIX = '.tmp'
+
+# Age (s) after which a temporary file is debris of a crashed writer
+TEMPORARY_MAX_AGE = 3600.0
+
+# Installed library directories, whose functions function_version does not follow
+_LIBRARY_PATHS = tuple(sorted({os.path.realpath(path) for name, path in sysconfig.get_paths().items()
+                               if name in ('stdlib', 'platstdlib', 'purelib', 'platlib')}))
+
+class Uncacheable(Exception):
+    """
+    Class Description:
+    Raised while hashing arguments that have no stable content hash; the call is
+    then run without the cache.
+    """
+
+def _hash_value(digest, value):
+    """
+    Function Description:
+    Feeds the content of one argument into a hash: dtype, shape and raw bytes for
+    arrays, the repr for plain scalars and strings, recursively for containers.
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        value = np.asarray(value)
+        if value.dtype.hasobject:
+            raise Uncacheable("object arrays have no stable content hash")
+        digest.update(f"ndarray:{value.dtype.str}:{value.shape}:".encode())
+        digest.update(np.ascontiguousarray(value).view(np.uint8).data)
+    elif value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f"{type(value).__name__}[{len(value)}]".encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict[{len(value)}]".encode())
+        for key in sorted(value, key=repr):
+            _hash_value(digest, key)
+            _hash_value(digest, value[key])
+    else:
+        raise Uncacheable(f"cannot hash arguments of type {type(value).__name__}")
+
+def result_key(name, version, args, kwargs):
+    """
+    Function Description:
+    Content hash of a function call: the function name and version, and the bytes,
+    dtype and shape of every array argument.
+
+    Parameters:
+    name (str): Qualified function name.
+    version (str): Function version (changes invalidate earlier results).
+    args (tuple): Positional arguments.
+    kwargs (dict): Keyword arguments.
+
+    Returns:
+    str: Hexadecimal key.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{name}@{version}|".encode())
+    _hash_value(digest, tuple(args))
+    _hash_value(digest, kwargs)
+    return digest.hexdigest()
+
+def _code_names(code):
+    """
+    Function Description:
+    Names a code object (and the functions nested in it) reads as globals or attributes.
+    """
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= _code_names(constant)
+    return names
+
+def _called_functions(func):
+    """
+    Function Description:
+    Module-level Python functions a function may call: the names its code reads,
+    resolved in its globals either directly ('from module import helper') or as
+    attributes of the modules it uses ('module.helper'). Functions of the standard
+    library and installed packages are left out.
+    """
+    names = sorted(_code_names(func.__code__))
+    namespace = func.__globals__
+    called = []
+    for name in names:
+        value = namespace.get(name)
+        candidates = [value]
+        if inspect.ismodule(value):
+            candidates = [getattr(value, attribute, None) for attribute in names]
+        for candidate in candidates:
+            candidate = inspect.unwrap(candidate) if callable(candidate) else candidate
+            if (inspect.isfunction(candidate) and candidate not in called
+                    and not os.path.realpath(candidate.__code__.co_filename).startswith(_LIBRARY_PATHS)):
+                called.append(candidate)
+    return called
+
+def function_version(func, _visited=None):
+    """
+    Function Description:
+    Default version of a function: a hash of its source code and of the versions of
+    the module-level functions it calls, so editing the function or any helper it
+    depends on (e.g. Error_Propagation.multiplication) invalidates its cached results.
+    """
+    func = inspect.unwrap(func)
+    visited = set() if _visited is None else _visited
+    visited.add(func)
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__code__.co_code.hex()
+
+    digest = hashlib.sha256(source.encode())
+    for helper in _called_functions(func):
+        if helper not in visited:
+            version = function_version(helper, visited)
+            digest.update(f"|{helper.__module__}.{helper.__qualname__}@{version}".encode())
+    return digest.hexdigest()[:16]
+
+def _copy_result(result):
+    """
+    Function Description:
+    Copies the arrays of a result, so callers modifying it cannot alter the cache.
+    """
+    if isinstance(result, np.ndarray):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy_result(item) for item in result)
+    if isinstance(result, list):
+        return [_copy_result(item) for item in result]
+    return result
+
+class ResultCache:
+    """
+    Class Description:
+    Two-tier cache of function results: an in-process LRU dictionary in front of a
+    directory of pickled entries named by their content key. The directory is kept
+    below max_bytes by deleting the least recently used entries (every hit refreshes
+    an entry's modification time).
+
+    Parameters:
+    directory (str): Cache directory (None for an in-process cache only).
+    max_bytes (int): Size limit of the cache directory.
+    memory_items (int): Number of results kept in the in-process tier.
+    """
+
+    def __init__(self, directory='.result_cache', max_bytes=256 * 2**20, memory_items=256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.counts = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0,
+                       'uncacheable': 0, 'write_errors': 0}
+
+        self.disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._remove_stale_temporaries()
+            self.disk_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _entries(self):
+        """
+        Function Description:
+        Lists (mtime, path, size) of every entry in the cache directory, including
+        temporary files of unfinished writes, which count toward max_bytes too.
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith((ENTRY_SUFFIX, TEMPORARY_SUFFIX)):
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((info.st_mtime, entry.path, info.st_size))
+        return entries
+
+    def _remove_stale_temporaries(self):
+        """
+        Function Description:
+        Deletes temporary files older than TEMPORARY_MAX_AGE, left by writers that
+        crashed between creating and renaming them.
+        """
+        cutoff = time.time() - TEMPORARY_MAX_AGE
+        for mtime, path, _ in self._entries():
+            if path.endswith(TEMPORARY_SUFFIX) and mtime < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Function Description:
+        Looks a key up in memory, then on disk.
+
+        Returns:
+        tuple: A tuple containing (found, result).
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.counts['memory_hits'] += 1
+            return True, _copy_result(self.memory[key])
+
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as entry:
+                    result = pickle.load(entry)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self.counts['disk_hits'] += 1
+                self._remember(key, result)
+                return True, _copy_result(result)
+
+        self.counts['misses'] += 1
+        return False, None
+
+    def put(self, key, result):
+        """
+        Function Description:
+        Stores a result in both tiers, evicting old disk entries beyond max_bytes.
+        Results that cannot be pickled or written (e.g. full disk, read-only
+        directory) are only kept in memory and counted as write_errors.
+        """
+        self._remember(key, _copy_result(result))
+        if self.directory is None:
+            return
+
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.counts['write_errors'] += 1
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        # A unique temporary name per writer, so processes storing the same key never collide
+        temporary = None
+        try:
+            handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=TEMPORARY_SUFFIX)
+            with os.fdopen(handle, 'wb') as entry:
+                entry.write(data)
+            os.replace(temporary, self._path(key))
+        except OSError:
+            # A failed store (full disk, read-only directory) must not fail the analysis
+            self.counts['write_errors'] += 1
+            if temporary is not None and os.path.exists(temporary):
+                try:
+                    os.remove(temporary)
+                except OSError:
+                    pass
+            return
+        self.disk_bytes += len(data)
+
+        if self.disk_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """
+        Function Description:
+        Deletes the least recently used entries until the directory fits in max_bytes.
+        """
+        entries = sorted(self._entries())
+        self.disk_bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.disk_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_bytes -= size
+            self.counts['evictions'] += 1
+
+    def clear(self):
+        """
+        Function Description:
+        Empties both tiers.
+        """
+        self.memory.clear()
+        if self.directory is not None:
+            for _, path, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.disk_bytes = 0
+
+    def stats(self):
+        """
+        Function Description:
+        Returns the hit, miss and eviction counts and the current cache sizes.
+        """
+        return dict(self.counts, memory_items=len(self.memory), disk_bytes=self.disk_bytes)
+
+_default_cache = None
+
+# Number of memoized calls in progress (nested calls bypass the cache)
+_depth = 0
+
+def configure(directory='.result_cache', max_bytes=256 * 2**20, memory_items=256):
+    """
+    Function Description:
+    Sets up the cache used by memoize() and install() when none is given.
+
+    Returns:
+    ResultCache: The new default cache.
+    """
+    global _default_cache
+    _default_cache = ResultCache(directory, max_bytes, memory_items)
+    return _default_cache
+
+def default_cache():
+    """
+    Function Description:
+    Returns the default cache, creating it in ./.result_cache on first use.
+    """
+    return _default_cache if _default_cache is not None else configure()
+
+def memoize(func=None, cache=None, version=None):
+    """
+    Function Description:
+    Decorator caching a function's results by the content of its arguments. Calls
+    with arguments that cannot be hashed (e.g. arbitrary objects) are not cached,
+    and neither are memoized calls made from inside another memoized function (the
+    outer result already covers them).
+
+    Parameters:
+    func (callable): Function to memoize (omit to use as @memoize(version=...)).
+    cache (ResultCache): Cache to use (default: the default cache at call time).
+    version (str): Function version (default: a hash of the function's source).
+
+    Returns:
+    callable: The memoized function.
+    """
+    if func is None:
+        return lambda func: memoize(func, cache, version)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+    version = version or function_version(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _depth
+        if _depth:
+            return func(*args, **kwargs)
+
+        store = cache or default_cache()
+        try:
+            key = result_key(name, version, args, kwargs)
+        except Uncacheable:
+            store.counts['uncacheable'] += 1
+            return func(*args, **kwargs)
+
+        found, result = store.get(key)
+        if found:
+            return result
+
+        _depth += 1
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _depth -= 1
+        store.put(key, result)
+        return result
+
+    wrapper.__memoized__ = func
+    return wrapper
+
+_installed = []
+
+def install(functions=CACHED_FUNCTIONS, cache=None):
+    """
+    Function Description:
+    Memoizes the given module functions in place, and rebinds names imported from
+    them with 'from module import function' in any loaded module.
+
+    Parameters:
+    functions (dict): Mapping of module names to function names (default: the
+                      fits and propagation functions of Lab 1).
+    cache (ResultCache): Cache to use (default: the default cache).
+
+    Returns:
+    int: Number of functions memoized.
+    """
+    replacements = {}
+    for module_name, names in functions.items():
+        module = importlib.import_module(module_name)
+        for name in names:
+            original = getattr(module, name)
+            if hasattr(original, '__memoized__'):
+                continue
+            replacements[id(original)] = (original, memoize(original, cache))
+
+    rebind_functions(replacements, _installed)
+
+    return len(replacements)
+
+def uninstall():
+    """
+    Function Description:
+    Restores every function and name replaced by install().
+    """
+    restore_functions(_installed)
+
+if __name__ == "__main__":
+    import time
+    from Benchmark_Suite import synthetic_measurements, _lab1_pipeline
+
+    rng = np.random.default_rng(0)
+    circuits = [synthetic_measurements(10**5, rng) for _ in range(20)]
+
+    cache = configure(os.path.join(tempfile.mkdtemp(), 'results'), max_bytes=64 * 2**20)
+    print(f"{install()} functions memoized, cache in {cache.directory}")
+
+    def analyse_all(label):
+        start = time.perf_counter()
+        for data in circuits:
+            _lab1_pipeline(data)
+        print(f"{label:<32} {time.perf_counter() - start:6.3f} s  {cache.stats()}")
+
+    analyse_all("First run")
+    analyse_all("Unchanged rerun")
+
+    # Edit one circuit's data: only its results are recomputed
+    circuits[2]['V'] = circuits[2]['V'] + 1e-4
+    analyse_all("Rerun after editing circuit 3")
+    uninstall()
+    analyse_all("Without the cache")
+    install()
+
+    # A fresh process only has the disk tier
+    cache.memory.clear()
+    analyse_all("Rerun from disk")
+    uninstall()
@@ -0,0 +1,227 @@
+from Linear_Fitting import weighted_line_from_moments
+import numpy as np
+
+# Names of the moment arrays making up an accumulator's state
+STATE_FIELDS = ('W', 'x_mean', 'y_mean', 'Sxx', 'Sxy', 'Syy',
+                'n', 'ux_mean', 'uy_mean', 'Uxx', 'Uxy', 'Uyy')
+
+def _chunk_moments(x, w):
+    """
+    Function Description:
+    Calculates the total weight, mean and centred second moment of x along the last axis.
+    """
+    W = w.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(W > 0, (w * x).sum(axis=-1) / W, 0.0)
+    dx = x - mean[..., None]
+    return W, mean, dx
+
+def _merge_moments(Wa, xa, ya, Sxx_a, Sxy_a, Syy_a, Wb, xb, yb, Sxx_b, Sxy_b, Syy_b):
+    """
+    Function Description:
+    Combines two sets of centred weighted moments (Chan et al. pairwise update).
+    """
+    W = Wa + Wb
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fb = np.where(W > 0, Wb / W, 0.0)
+    delta_x = xb - xa
+    delta_y = yb - ya
+    cross = Wa * fb
+
+    x_mean = xa + delta_x * fb
+    y_mean = ya + delta_y * fb
+    Sxx = Sxx_a + Sxx_b + delta_x * delta_x * cross
+    Sxy = Sxy_a + Sxy_b + delta_x * delta_y * cross
+    Syy = Syy_a + Syy_b + delta_y * delta_y * cross
+
+    return W, x_mean, y_mean, Sxx, Sxy, Syy
+
+class LinearFitAccumulator:
+    """
+    Class Description:
+    Online, mergeable accumulator for the inverse-variance weighted fit y = mx + b.
+    Keeps O(1) state per fit (centred weighted moments of x and y, plus unweighted
+    moments for the y_variance), so data can be fed in chunks and partial states
+    reduced on separate workers can be merged afterwards.
+
+    By default result() returns the weighted fit's sigma-based standard errors, as
+    batch_linear_fitter does. linear_fitter scales its errors by the residual
+    scatter instead; pass scaled_errors=True to result() to get those.
+
+    Parameters:
+    shape (tuple): Shape of the batch of independent fits (default: a single fit).
+    """
+
+    def __init__(self, shape=()):
+        for field in STATE_FIELDS:
+            setattr(self, field, np.zeros(shape))
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Function Description:
+        Rebuilds an accumulator from the dictionary returned by state().
+        """
+        accumulator = cls.__new__(cls)
+        for field in STATE_FIELDS:
+            setattr(accumulator, field, np.array(state[field], dtype=float))
+        return accumulator
+
+    def state(self):
+        """
+        Function Description:
+        Returns the accumulator state as a dictionary of arrays (picklable, or
+        storable with np.savez).
+        """
+        return {field: getattr(self, field) for field in STATE_FIELDS}
+
+    def _merge_state(self, W, x_mean, y_mean, Sxx, Sxy, Syy, n, ux_mean, uy_mean, Uxx, Uxy, Uyy):
+        (self.W, self.x_mean, self.y_mean,
+         self.Sxx, self.Sxy, self.Syy) = _merge_moments(
+            self.W, self.x_mean, self.y_mean, self.Sxx, self.Sxy, self.Syy,
+            W, x_mean, y_mean, Sxx, Sxy, Syy)
+        (self.n, self.ux_mean, self.uy_mean,
+         self.Uxx, self.Uxy, self.Uyy) = _merge_moments(
+            self.n, self.ux_mean, self.uy_mean, self.Uxx, self.Uxy, self.Uyy,
+            n, ux_mean, uy_mean, Uxx, Uxy, Uyy)
+
+    def update(self, x_inputs, y_inputs, y_uncertainties):
+        """
+        Function Description:
+        Adds a chunk of data points to the fit.
+
+        Parameters:
+        x_inputs (array_like): Array of x-values; the last axis indexes points.
+        y_inputs (array_like): Array of y-values.
+        y_uncertainties (array_like): Array of uncertainties in y-values.
+
+        Returns:
+        LinearFitAccumulator: The updated accumulator (self).
+        """
+        x = np.asarray(x_inputs, dtype=float)
+        y = np.asarray(y_inputs, dtype=float)
+        w = np.broadcast_to(1.0 / np.asarray(y_uncertainties, dtype=float)**2, y.shape)
+
+        # Weighted moments of the chunk
+        W, x_mean, dx = _chunk_moments(x, w)
+        _, y_mean, dy = _chunk_moments(y, w)
+        wdx = w * dx
+
+        # Unweighted moments of the chunk
+        ones = np.ones(y.shape)
+        n, ux_mean, udx = _chunk_moments(x, ones)
+        _, uy_mean, udy = _chunk_moments(y, ones)
+
+        self._merge_state(
+            W, x_mean, y_mean,
+            (wdx * dx).sum(axis=-1), (wdx * dy).sum(axis=-1), (w * dy * dy).sum(axis=-1),
+            n, ux_mean, uy_mean,
+            (udx * udx).sum(axis=-1), (udx * udy).sum(axis=-1), (udy * udy).sum(axis=-1))
+
+        return self
+
+    def merge(self, other):
+        """
+        Function Description:
+        Merges the state of another accumulator (e.g. from a worker process) into this one.
+
+        Parameters:
+        other (LinearFitAccumulator): Accumulator fitted on a different shard of data.
+
+        Returns:
+        LinearFitAccumulator: The updated accumulator (self).
+        """
+        self._merge_state(*(getattr(other, field) for field in STATE_FIELDS))
+        return self
+
+    def result(self, scaled_errors=False):
+        """
+        Function Description:
+        Calculates the fit statistics for all data seen so far. The values are those
+        of the weighted fit (see batch_linear_fitter); residuals are not available
+        since the individual points are not kept.
+
+        Parameters:
+        scaled_errors (bool): Return m_stdrd_dev and b_stdrd_dev scaled by
+                              sqrt(reduced_chi_squared), i.e. from the residual scatter
+                              like linear_fitter, instead of propagated from the y
+                              uncertainties.
+
+        Returns:
+        tuple: A tuple containing (m, b, m_stdrd_dev, b_stdrd_dev, y_variance,
+                chi_squared, reduced_chi_squared, p_value)
+        """
+        (m, b, m_stdrd_dev, b_stdrd_dev, chi_squared,
+         degrees_of_freedom, reduced_chi_squared, p_value) = weighted_line_from_moments(
+            self.W, self.x_mean, self.y_mean, self.Sxx, self.Sxy, self.Syy, self.n)
+
+        # sum((y - m*x - b)**2) from the unweighted moments
+        offset = self.uy_mean - m * self.ux_mean - b
+        sum_sq_residuals = (self.Uyy - 2 * m * self.Uxy + m**2 * self.Uxx
+                            + self.n * offset**2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_variance = np.sqrt(np.maximum(sum_sq_residuals, 0.0) / degrees_of_freedom)
+
+        if scaled_errors:
+            m_stdrd_dev = m_stdrd_dev * np.sqrt(reduced_chi_squared)
+            b_stdrd_dev = b_stdrd_dev * np.sqrt(reduced_chi_squared)
+
+        return (m, b, m_stdrd_dev, b_stdrd_dev, y_variance,
+                chi_squared, reduced_chi_squared, p_value)
+
+def fit_stream(chunks, shape=()):
+    """
+    Function Description:
+    Fits a straight line to data arriving as a stream of chunks.
+
+    Parameters:
+    chunks (iterable): Iterable yielding (x_inputs, y_inputs, y_uncertainties) tuples.
+    shape (tuple): Shape of the batch of independent fits (default: a single fit).
+
+    Returns:
+    LinearFitAccumulator: Accumulator holding the reduced state; call result() for statistics.
+    """
+    accumulator = LinearFitAccumulator(shape)
+    for x_inputs, y_inputs, y_uncertainties in chunks:
+        accumulator.update(x_inputs, y_inputs, y_uncertainties)
+    return accumulator
+
+def merge_accumulators(accumulators):
+    """
+    Function Description:
+    Combines the partial states of several accumulators, e.g. one per worker process.
+
+    Parameters:
+    accumulators (iterable): Iterable of LinearFitAccumulator objects or state() dictionaries.
+
+    Returns:
+    LinearFitAccumulator: Accumulator holding the combined state.
+    """
+    combined = None
+    for accumulator in accumulators:
+        if isinstance(accumulator, dict):
+            accumulator = LinearFitAccumulator.from_state(accumulator)
+        if combined is None:
+            combined = LinearFitAccumulator(np.shape(accumulator.W))
+        combined.merge(accumulator)
+    return combined
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    def acquisition(n_chunks, chunk_size):
+        # Simulated DMM log: V = 6.501 V - (0.05 Ω) I with 5 mV noise
+        for _ in range(n_chunks):
+            I = rng.uniform(0.0, 0.065, chunk_size)
+            V = 6.501 - 0.05 * I + rng.normal(0.0, 0.005, chunk_size)
+            yield I, V, np.full(chunk_size, 0.005)
+
+    # Two shards reduced separately, then merged
+    shard1 = fit_stream(acquisition(10, 100000))
+    shard2 = fit_stream(acquisition(10, 100000))
+    combined = merge_accumulators([shard1, shard2.state()])
+
+    m, b, m_err, b_err, y_var, chi2, red_chi2, p_value = combined.result()
+    print(f"Slope: {m:.4f} ± {m_err:.4f} Ω")
+    print(f"Intercept: {b:.5f} ± {b_err:.5f} V")
+    print(f"Reduced chi-squared: {red_chi2:.3f}")
@@ -0,0 +1,302 @@
+import numpy as np
+
+# d f(x) / dx for the unary ufuncs, given x and the computed value f(x)
+UNARY_DERIVATIVES = {
+    np.negative: lambda x, value: -np.ones_like(x),
+    np.positive: lambda x, value: np.ones_like(x),
+    np.absolute: lambda x, value: np.sign(x),
+    np.sqrt: lambda x, value: 0.5 / value,
+    np.square: lambda x, value: 2.0 * x,
+    np.reciprocal: lambda x, value: -value * value,
+    np.exp: lambda x, value: value,
+    np.log: lambda x, value: 1.0 / x,
+    np.log10: lambda x, value: 1.0 / (x * np.log(10.0)),
+    np.log2: lambda x, value: 1.0 / (x * np.log(2.0)),
+    np.sin: lambda x, value: np.cos(x),
+    np.cos: lambda x, value: -np.sin(x),
+    np.tan: lambda x, value: 1.0 + value * value,
+    np.arcsin: lambda x, value: 1.0 / np.sqrt(1.0 - x * x),
+    np.arccos: lambda x, value: -1.0 / np.sqrt(1.0 - x * x),
+    np.arctan: lambda x, value: 1.0 / (1.0 + x * x),
+    np.sinh: lambda x, value: np.cosh(x),
+    np.cosh: lambda x, value: np.sinh(x),
+    np.tanh: lambda x, value: 1.0 - value * value,
+}
+
+def _split(operand):
+    """
+    Function Description:
+    Returns (value, sigma) of an operand; plain numbers and arrays have no uncertainty.
+    """
+    if isinstance(operand, UncertainArray):
+        return operand.value, operand.sigma
+    return np.asarray(operand, dtype=float), None
+
+def _add(a, sa, b, sb, out_value, out_sigma, sign=1.0):
+    """
+    Function Description:
+    z = a + sign*b with dz = sqrt(da**2 + db**2), written into the output arrays.
+    """
+    if sign > 0:
+        np.add(a, b, out=out_value)
+    else:
+        np.subtract(a, b, out=out_value)
+
+    if sa is None and sb is None:
+        out_sigma[...] = 0.0
+    elif sb is None:
+        out_sigma[...] = sa
+    elif sa is None:
+        out_sigma[...] = sb
+    else:
+        np.hypot(sa, sb, out=out_sigma)
+
+def _multiply(a, sa, b, sb, out_value, out_sigma):
+    """
+    Function Description:
+    z = a * b with dz = sqrt((b*da)**2 + (a*db)**2), written into the output arrays.
+    Equivalent to z * sqrt((da/a)**2 + (db/b)**2) but safe when a or b is zero.
+    """
+    if sa is None and sb is None:
+        out_sigma[...] = 0.0
+    elif sb is None:
+        np.multiply(sa, b, out=out_sigma)
+        np.absolute(out_sigma, out=out_sigma)
+    elif sa is None:
+        np.multiply(a, sb, out=out_sigma)
+        np.absolute(out_sigma, out=out_sigma)
+    else:
+        a_db = np.multiply(a, sb)
+        np.multiply(sa, b, out=out_sigma)
+        np.hypot(out_sigma, a_db, out=out_sigma)
+
+    np.multiply(a, b, out=out_value)
+
+def _divide(a, sa, b, sb, out_value, out_sigma):
+    """
+    Function Description:
+    z = a / b with dz = sqrt(da**2 + (z*db)**2) / |b|, written into the output arrays.
+    """
+    if sa is None and sb is None:
+        np.divide(a, b, out=out_value)
+        out_sigma[...] = 0.0
+        return
+
+    if sb is None:
+        np.divide(sa, b, out=out_sigma)
+        np.divide(a, b, out=out_value)
+    else:
+        abs_b = np.absolute(b)
+        np.divide(a, b, out=out_value)
+        z_db = np.multiply(out_value, sb)
+        if sa is None:
+            np.absolute(z_db, out=out_sigma)
+        else:
+            np.hypot(sa, z_db, out=out_sigma)
+        np.divide(out_sigma, abs_b, out=out_sigma)
+
+    np.absolute(out_sigma, out=out_sigma)
+
+def _power(a, sa, b, sb, out_value, out_sigma):
+    """
+    Function Description:
+    z = a ** b with dz = sqrt((b*a**(b-1)*da)**2 + (z*ln(a)*db)**2), written into
+    the output arrays.
+    """
+    z = np.power(a, b)
+
+    if sa is None and sb is None:
+        out_sigma[...] = 0.0
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if sa is not None:
+                dz_a = np.power(a, b - 1.0)
+                dz_a *= b
+                dz_a *= sa
+            if sb is not None:
+                dz_b = np.log(a)
+                dz_b *= z
+                dz_b *= sb
+
+        if sb is None:
+            np.absolute(dz_a, out=out_sigma)
+        elif sa is None:
+            np.absolute(dz_b, out=out_sigma)
+        else:
+            np.hypot(dz_a, dz_b, out=out_sigma)
+
+    out_value[...] = z
+
+BINARY_KERNELS = {
+    np.add: lambda a, sa, b, sb, v, s: _add(a, sa, b, sb, v, s, 1.0),
+    np.subtract: lambda a, sa, b, sb, v, s: _add(a, sa, b, sb, v, s, -1.0),
+    np.multiply: _multiply,
+    np.divide: _divide,
+    np.true_divide: _divide,
+    np.power: _power,
+}
+
+class UncertainArray:
+    """
+    Class Description:
+    NumPy-backed array of values with RMS (first-order) uncertainties. Arithmetic
+    operators and common ufuncs propagate the uncertainty the same way as the
+    multiplication and addition functions in Error_Propagation, treating every
+    operand as independent, without the dummy w arrays or intermediate relative
+    error arrays.
+
+    Parameters:
+    value (array_like): Array of values.
+    sigma (array_like): Array of uncertainty values (broadcast to value's shape).
+    """
+
+    def __init__(self, value, sigma=0.0):
+        self.value = np.array(value, dtype=float)
+        self.sigma = np.array(np.broadcast_to(np.abs(sigma), self.value.shape), dtype=float)
+
+    # Array protocol
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    @property
+    def size(self):
+        return self.value.size
+
+    @property
+    def ndim(self):
+        return self.value.ndim
+
+    def __len__(self):
+        return len(self.value)
+
+    def __getitem__(self, index):
+        result = UncertainArray.__new__(UncertainArray)
+        result.value = self.value[index]
+        result.sigma = self.sigma[index]
+        return result
+
+    def __repr__(self):
+        return f"UncertainArray(value={self.value!r}, sigma={self.sigma!r})"
+
+    def __format__(self, spec):
+        if self.value.ndim == 0:
+            return f"{format(float(self.value), spec)} ± {format(float(self.sigma), spec)}"
+        return repr(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs.get('out') is not None:
+            return NotImplemented
+
+        if ufunc in BINARY_KERNELS and len(inputs) == 2:
+            a, sa = _split(inputs[0])
+            b, sb = _split(inputs[1])
+            shape = np.broadcast_shapes(a.shape, b.shape)
+            result = UncertainArray.__new__(UncertainArray)
+            result.value = np.empty(shape)
+            result.sigma = np.empty(shape)
+            BINARY_KERNELS[ufunc](a, sa, b, sb, result.value, result.sigma)
+            return result
+
+        if ufunc in UNARY_DERIVATIVES and len(inputs) == 1:
+            x, sx = _split(inputs[0])
+            result = UncertainArray.__new__(UncertainArray)
+            result.value = np.asarray(ufunc(x))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                derivative = np.asarray(UNARY_DERIVATIVES[ufunc](x, result.value))
+            if derivative is result.value:
+                result.sigma = np.multiply(derivative, sx, out=np.empty_like(derivative))
+            else:
+                result.sigma = np.multiply(derivative, sx, out=derivative)
+            np.absolute(result.sigma, out=result.sigma)
+            return result
+
+        return NotImplemented
+
+    # Binary operators
+
+    def _binary(self, ufunc, other, reflected=False):
+        if reflected:
+            return self.__array_ufunc__(ufunc, '__call__', other, self)
+        return self.__array_ufunc__(ufunc, '__call__', self, other)
+
+    def _inplace(self, ufunc, other):
+        b, sb = _split(other)
+        BINARY_KERNELS[ufunc](self.value, self.sigma, b, sb, self.value, self.sigma)
+        return self
+
+    def __add__(self, other):
+        return self._binary(np.add, other)
+
+    def __radd__(self, other):
+        return self._binary(np.add, other, reflected=True)
+
+    def __iadd__(self, other):
+        return self._inplace(np.add, other)
+
+    def __sub__(self, other):
+        return self._binary(np.subtract, other)
+
+    def __rsub__(self, other):
+        return self._binary(np.subtract, other, reflected=True)
+
+    def __isub__(self, other):
+        return self._inplace(np.subtract, other)
+
+    def __mul__(self, other):
+        return self._binary(np.multiply, other)
+
+    def __rmul__(self, other):
+        return self._binary(np.multiply, other, reflected=True)
+
+    def __imul__(self, other):
+        return self._inplace(np.multiply, other)
+
+    def __truediv__(self, other):
+        return self._binary(np.divide, other)
+
+    def __rtruediv__(self, other):
+        return self._binary(np.divide, other, reflected=True)
+
+    def __itruediv__(self, other):
+        return self._inplace(np.divide, other)
+
+    def __pow__(self, other):
+        return self._binary(np.power, other)
+
+    def __rpow__(self, other):
+        return self._binary(np.power, other, reflected=True)
+
+    def __ipow__(self, other):
+        return self._inplace(np.power, other)
+
+    # Unary operators
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __pos__(self):
+        return np.positive(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
+if __name__ == "__main__":
+    from Resistance_Calc import calculate_uncertainty_R_V
+
+    # Circuit Option 2 values from Resistance_Calc
+    R_li = UncertainArray([100.32, 219.91, 26814.0, 101570.0], [0.25, 0.49, 59.0, 250.0])  # Ω
+    V = UncertainArray([6.386, 6.448, 6.501, 6.501], 0.005)  # V
+    I = UncertainArray(np.array([63.60, 29.322, 0.243, 0.065]) / 1000.0,
+                       np.array([0.18, 0.064, 0.051, 0.005]) / 1000.0)  # A
+
+    R_V = (V * R_li) / (I * R_li - V)
+    dR_V = calculate_uncertainty_R_V(V.value, I.value, R_li.value, V.sigma, I.sigma, R_li.sigma)
+
+    print("Voltmeter Resistances R_V (Ω):")
+    print(R_V.value)
+    print("\nUncertainty from UncertainArray (Ω):")
+    print(R_V.sigma)
+    print("\nUncertainty from calculate_uncertainty_R_V (Ω):")
+    print(np.abs(dR_V))
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Order of the Hartmann parameters in fits and covariance matrices
+PARAMETERS = ('lambda_0', 'C', 'y_0')
+
+def hartmann_wavelength(y, lambda_0, C, y_0):
+    """
+    Function Description:
+    Hartmann relation lambda = lambda_0 + C / (y - y_0) between the spectrometer
+    scale reading y and the wavelength (y = m / (lambda - lambda_0) + b in the
+    report, with m = C and b = y_0).
+
+    Parameters:
+    y (array_like): Array of scale readings.
+    lambda_0 (array_like): Hartmann constant lambda_0 (wavelength units).
+    C (array_like): Hartmann constant C (wavelength x reading units).
+    y_0 (array_like): Hartmann constant y_0 (reading units).
+
+    Returns:
+    array_like: Array of wavelengths.
+    """
+    return lambda_0 + C / (y - y_0)
+
+def _jacobian(y, C, y_0):
+    """
+    Function Description:
+    Partial derivatives of the Hartmann relation with respect to (lambda_0, C, y_0)
+    and to the reading y.
+    """
+    inverse = 1.0 / (y - y_0)
+    d_lambda_0 = np.ones_like(inverse)
+    d_C = inverse
+    d_y_0 = C * inverse**2
+    return np.stack((d_lambda_0, d_C, d_y_0), axis=-1), -d_y_0
+
+def _initial_guess(y, wavelengths, weights, n_candidates=64):
+    """
+    Function Description:
+    Starting values for every calibration set. For fixed y_0 the relation is linear
+    in 1/(y - y_0), so lambda_0 and C follow from a weighted straight-line fit; the
+    y_0 candidate with the smallest chi-squared is kept.
+    """
+    y_min = y.min(axis=1, keepdims=True)
+    y_max = y.max(axis=1, keepdims=True)
+    span = y_max - y_min
+    scale = np.logspace(-2, 2, n_candidates // 2)[None, :]
+    y_0 = np.concatenate((y_min - span * scale, y_max + span * scale), axis=1)  # (sets, K)
+
+    u = 1.0 / (y[:, None, :] - y_0[:, :, None])
+    w = weights[:, None, :]
+    W = w.sum(axis=-1)
+    u_mean = (w * u).sum(axis=-1) / W
+    l_mean = (w * wavelengths[:, None, :]).sum(axis=-1) / W
+    du = u - u_mean[..., None]
+    dl = wavelengths[:, None, :] - l_mean[..., None]
+    C = (w * du * dl).sum(axis=-1) / (w * du * du).sum(axis=-1)
+    lambda_0 = l_mean - C * u_mean
+    chi_squared = (w * (dl - C[..., None] * du) ** 2).sum(axis=-1)
+
+    best = np.argmin(chi_squared, axis=1)
+    rows = np.arange(y.shape[0])
+    return np.stack((lambda_0[rows, best], C[rows, best], y_0[rows, best]), axis=1)
+
+def _solve_sets(matrices, vectors):
+    """
+    Function Description:
+    Solves the linear systems of every set, falling back to the pseudo-inverse when
+    one of them is singular, so a degenerate set cannot abort the whole batch.
+    """
+    try:
+        return np.linalg.solve(matrices, vectors)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(matrices) @ vectors
+
+def fit_hartmann(y, wavelengths, y_uncertainties, wavelength_uncertainties=0.0,
+                 max_iterations=100, tolerance=1e-10):
+    """
+    Function Description:
+    Fits the Hartmann relation to many calibration sets at once with a vectorized
+    Levenberg-Marquardt iteration. Reading uncertainties are converted to wavelength
+    uncertainties with the local slope of the relation (effective variance), and
+    each set has its own damping and convergence flag.
+
+    Parameters:
+    y (array_like): Scale readings of the calibration lines, shape (sets, lines) or
+                    (lines,); NaN marks missing lines in ragged sets.
+    wavelengths (array_like): Reference wavelengths of the calibration lines.
+    y_uncertainties (array_like): Uncertainties in the readings.
+    wavelength_uncertainties (array_like): Uncertainties in the reference wavelengths.
+    max_iterations (int): Maximum number of iterations.
+    tolerance (float): Relative chi-squared change at which a set has converged.
+
+    Returns:
+    ndarray: Structured array with one record per set and the fields (lambda_0, C,
+             y_0, covariance (3x3), chi_squared, degrees_of_freedom,
+             reduced_chi_squared, iterations, converged). Sets with fewer than
+             three valid lines have NaN parameters and converged=False.
+    """
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    wavelengths = np.broadcast_to(np.atleast_2d(np.asarray(wavelengths, dtype=float)), y.shape)
+    sigma_y = np.broadcast_to(np.asarray(y_uncertainties, dtype=float), y.shape)
+    sigma_l = np.broadcast_to(np.asarray(wavelength_uncertainties, dtype=float), y.shape)
+
+    # Sets with fewer lines than parameters are not fitted and get NaN parameters
+    mask = np.isfinite(y) & np.isfinite(wavelengths)
+    degrees_of_freedom = mask.sum(axis=1) - 3
+    fitted = degrees_of_freedom >= 0
+    y, wavelengths, mask = y[fitted], wavelengths[fitted], mask[fitted]
+    sigma_y, sigma_l = sigma_y[fitted], sigma_l[fitted]
+
+    # Missing lines are filled with a reading from the same set and given zero weight
+    y = np.where(mask, y, np.max(np.where(mask, y, -np.inf), axis=1, keepdims=True))
+    wavelengths = np.where(mask, wavelengths, 0.0)
+
+    def weights_and_chi2(params):
+        J, dl_dy = _jacobian(y, params[:, 1:2], params[:, 2:3])
+        variance = (dl_dy * sigma_y) ** 2 + sigma_l ** 2
+        w = np.where(mask, 1.0 / variance, 0.0)
+        residual = wavelengths - hartmann_wavelength(y, params[:, 0:1], params[:, 1:2], params[:, 2:3])
+        residual = np.where(mask, residual, 0.0)
+        return J, w, residual, (w * residual**2).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        params = _initial_guess(y, wavelengths,
+                                np.where(mask, 1.0 / (sigma_y**2 + sigma_l**2), 0.0))
+    damping = np.full(y.shape[0], 1e-3)
+    active = np.ones(y.shape[0], dtype=bool)
+    iterations = np.zeros(y.shape[0], dtype=int)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        J, w, residual, chi_squared = weights_and_chi2(params)
+    for _ in range(max_iterations):
+        # Damped normal equations for every set
+        JTWJ = np.einsum('sni,sn,snj->sij', J, w, J)
+        JTWr = np.einsum('sni,sn,sn->si', J, w, residual)
+        diagonal = np.einsum('sii->si', JTWJ)
+        damped = JTWJ + damping[:, None, None] * diagonal[:, :, None] * np.eye(3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = _solve_sets(damped, JTWr[..., None])[..., 0]
+        step[~active] = 0.0
+
+        trial = params + step
+        with np.errstate(divide='ignore', invalid='ignore'):
+            J_trial, w_trial, residual_trial, chi_trial = weights_and_chi2(trial)
+        accept = active & (chi_trial <= chi_squared)
+
+        # Accepted steps relax the damping, rejected ones increase it
+        params = np.where(accept[:, None], trial, params)
+        J = np.where(accept[:, None, None], J_trial, J)
+        w = np.where(accept[:, None], w_trial, w)
+        residual = np.where(accept[:, None], residual_trial, residual)
+        change = np.abs(chi_squared - chi_trial) / np.maximum(chi_squared, 1e-300)
+        chi_squared = np.where(accept, chi_trial, chi_squared)
+        damping = np.where(accept, damping / 10.0, damping * 10.0)
+        iterations += active
+
+        active &= ~((accept & (change < tolerance)) | (damping > 1e12))
+        if not active.any():
+            break
+
+    JTWJ = np.einsum('sni,sn,snj->sij', J, w, J)
+    with np.errstate(invalid='ignore'):
+        covariance = _solve_sets(JTWJ, np.broadcast_to(np.eye(3), JTWJ.shape))
+
+    results = np.empty(fitted.size, dtype=[
+        ('lambda_0', float), ('C', float), ('y_0', float), ('covariance', float, (3, 3)),
+        ('chi_squared', float), ('degrees_of_freedom', int), ('reduced_chi_squared', float),
+        ('iterations', int), ('converged', bool)])
+    for name in ('lambda_0', 'C', 'y_0', 'covariance', 'chi_squared'):
+        results[name] = np.nan
+    results['iterations'] = 0
+    results['converged'] = False
+
+    results['lambda_0'][fitted] = params[:, 0]
+    results['C'][fitted] = params[:, 1]
+    results['y_0'][fitted] = params[:, 2]
+    results['covariance'][fitted] = covariance
+    results['chi_squared'][fitted] = chi_squared
+    results['degrees_of_freedom'] = degrees_of_freedom
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['reduced_chi_squared'] = np.where(degrees_of_freedom > 0,
+                                                  results['chi_squared'] / degrees_of_freedom, np.nan)
+    results['iterations'][fitted] = iterations
+    results['converged'][fitted] = ~active & np.isfinite(params).all(axis=1) & np.isfinite(chi_squared)
+
+    return results
+
+def wavelength_from_reading(y, dy, calibration):
+    """
+    Function Description:
+    Converts scale readings to wavelengths with one calibration, propagating both the
+    reading uncertainty and the full parameter covariance of the calibration.
+
+    Parameters:
+    y (array_like): Array of scale readings.
+    dy (array_like): Array of uncertainty values for the readings.
+    calibration (record or dict): One calibration from fit_hartmann (or the cache).
+
+    Returns:
+    tuple: A tuple containing (wavelength, d_wavelength)
+    """
+    y = np.asarray(y, dtype=float)
+    C = calibration['C']
+    y_0 = calibration['y_0']
+    covariance = np.asarray(calibration['covariance'], dtype=float)
+
+    wavelength = hartmann_wavelength(y, calibration['lambda_0'], C, y_0)
+    J, dl_dy = _jacobian(y, C, y_0)
+    variance = np.einsum('...i,ij,...j->...', J, covariance, J) + (dl_dy * dy) ** 2
+
+    return wavelength, np.sqrt(variance)
+
+def rydberg_constant(wavelength, d_wavelength, n_f, n_i):
+    """
+    Function Description:
+    Rydberg constant from hydrogen line wavelengths, 1/lambda = R_H (1/n_f**2 - 1/n_i**2).
+
+    Parameters:
+    wavelength (array_like): Array of wavelengths (R_H is returned in inverse units).
+    d_wavelength (array_like): Array of uncertainty values for the wavelengths.
+    n_f (array_like): Final principal quantum numbers (2 for the Balmer series).
+    n_i (array_like): Initial principal quantum numbers.
+
+    Returns:
+    tuple: A tuple containing (R_H, d_R_H)
+    """
+    n_f = np.asarray(n_f, dtype=float)
+    n_i = np.asarray(n_i, dtype=float)
+    R_H = 1.0 / (wavelength * (1.0 / n_f**2 - 1.0 / n_i**2))
+    return R_H, np.abs(R_H * d_wavelength / wavelength)
+
+class CalibrationCache:
+    """
+    Class Description:
+    Small JSON file of fitted Hartmann calibrations, keyed by spectrometer station
+    and a hash of the lamp data, so unchanged calibrations are never refitted.
+
+    Parameters:
+    path (str): Path of the JSON cache file (created on first store).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as cache:
+                self.entries = json.load(cache)
+
+    @staticmethod
+    def key(station, y, wavelengths, y_uncertainties, wavelength_uncertainties=0.0):
+        """
+        Function Description:
+        Cache key from the station name and the bytes of the lamp data.
+        """
+        digest = hashlib.sha256()
+        for values in (y, wavelengths, y_uncertainties, wavelength_uncertainties):
+            values = np.ascontiguousarray(values, dtype=float)
+            digest.update(str(values.shape).encode())
+            digest.update(values.tobytes())
+        return f"{station}:{digest.hexdigest()[:16]}"
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def store(self, key, calibration):
+        self.entries[key] = {name: np.asarray(calibration[name]).tolist()
+                             for name in calibration.dtype.names}
+        with open(self.path + '.tmp', 'w') as cache:
+            json.dump(self.entries, cache, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+    def calibrate(self, station, y, wavelengths, y_uncertainties, wavelength_uncertainties=0.0):
+        """
+        Function Description:
+        Returns the calibration of a station's lamp data, fitting it only if it is
+        not already cached. Only converged fits are stored.
+
+        Returns:
+        dict: Dictionary with the fields returned by fit_hartmann.
+        """
+        key = self.key(station, y, wavelengths, y_uncertainties, wavelength_uncertainties)
+        if key not in self.entries:
+            calibration = fit_hartmann(y, wavelengths, y_uncertainties, wavelength_uncertainties)[0]
+            if not calibration['converged']:
+                raise ValueError(f"Hartmann fit of '{station}' did not converge "
+                                 f"({calibration['degrees_of_freedom'] + 3} valid lines)")
+            self.store(key, calibration)
+        return self.entries[key]
+
+if __name__ == "__main__":
+    import tempfile
+
+    rng = np.random.default_rng(0)
+
+    # Helium calibration lines (nm) read on a simulated station
+    helium = np.array([447.15, 471.31, 492.19, 501.57, 587.56, 667.82, 706.52])
+    true_lambda_0, true_C, true_y_0 = 230.0, 1500.0, 2.0  # nm, nm·div, div
+    y_helium = true_y_0 + true_C / (helium - true_lambda_0) + rng.normal(0.0, 0.01, helium.size)
+
+    cache = CalibrationCache(os.path.join(tempfile.mkdtemp(), 'hartmann_cache.json'))
+    calibration = cache.calibrate('station 3', y_helium, helium, 0.01)
+    errors = np.sqrt(np.diag(np.asarray(calibration['covariance'])))
+    print("=== Hartmann calibration ===")
+    for name, value, error in zip(PARAMETERS, (calibration[p] for p in PARAMETERS), errors):
+        print(f"{name} = {value:.3f} ± {error:.3f}")
+    print(f"Reduced chi-squared: {calibration['reduced_chi_squared']:.2f}")
+
+    # Balmer lines H-alpha, H-beta, H-gamma, H-delta read on the same station
+    n_i = np.array([3, 4, 5, 6])
+    balmer = 1e9 / (1.0967758e7 * (1 / 4 - 1 / n_i**2))  # nm
+    y_hydrogen = true_y_0 + true_C / (balmer - true_lambda_0) + rng.normal(0.0, 0.01, n_i.size)
+
+    wavelength, d_wavelength = wavelength_from_reading(y_hydrogen, 0.01, calibration)
+    R_H, d_R_H = rydberg_constant(wavelength * 1e-9, d_wavelength * 1e-9, 2, n_i)
+    print("\n=== Rydberg constant ===")
+    for n, l, dl, R, dR in zip(n_i, wavelength, d_wavelength, R_H, d_R_H):
+        print(f"n_i = {n}: lambda = {l:.2f} ± {dl:.2f} nm, R_H = {R:.4e} ± {dR:.1e} m^-1")
+
+    # Many calibration sets fitted in one call
+    sets = 10000
+    y_sets = true_y_0 + true_C / (helium - true_lambda_0) + rng.normal(0.0, 0.01, (sets, helium.size))
+    fits = fit_hartmann(y_sets, helium, 0.01)
+    print(f"\n{sets} calibration sets: {fits['converged'].mean():.1%} converged, "
+          f"median reduced chi-squared {np.median(fits['reduced_chi_squared']):.2f}")
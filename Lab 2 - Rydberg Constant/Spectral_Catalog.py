@@ -0,0 +1,206 @@
+import os
+import numpy as np
+
+# Bundled catalog of strong visible lines (element, wavelength_nm, relative_intensity)
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spectral_lines.csv')
+
+# Fields of the structured array returned by SpectralCatalog.match
+MATCH_DTYPE = np.dtype([
+    ('line', np.int64), ('catalog_line', np.int64), ('element', np.int64),
+    ('wavelength', float), ('residual', float), ('z', float),
+])
+
+class SpectralCatalog:
+    """
+    Class Description:
+    Catalog of reference emission lines indexed by wavelength. The lines of all
+    elements are kept in one array sorted by wavelength, so the candidates of any
+    measured line are found with two binary searches (a tolerance join) instead of
+    a loop over elements and lines.
+
+    Parameters:
+    elements (array_like): Element symbol of every line.
+    wavelengths (array_like): Wavelength of every line (nm).
+    intensities (array_like): Relative intensity of every line (per element scale).
+    """
+
+    def __init__(self, elements, wavelengths, intensities):
+        order = np.argsort(wavelengths, kind='stable')
+        self.elements, element_index = np.unique(np.asarray(elements)[order], return_inverse=True)
+        self.element_index = element_index.ravel()
+        self.wavelength = np.asarray(wavelengths, dtype=float)[order]
+        self.intensity = np.asarray(intensities, dtype=float)[order]
+
+    def __len__(self):
+        return self.wavelength.size
+
+    def lines(self, element):
+        """
+        Function Description:
+        Returns the (wavelengths, intensities) of one element's lines.
+        """
+        index = np.searchsorted(self.elements, element)
+        if index >= self.elements.size or self.elements[index] != element:
+            raise KeyError(f"No lines of '{element}' in the catalog")
+        selected = self.element_index == index
+        return self.wavelength[selected], self.intensity[selected]
+
+    def match(self, wavelengths, d_wavelengths, calibration_sigma=0.0, n_sigma=3.0):
+        """
+        Function Description:
+        Finds every catalog line within n_sigma combined standard deviations of each
+        measured line, where the combined variance is d_wavelength**2 + calibration_sigma**2.
+
+        Parameters:
+        wavelengths (array_like): Array of measured wavelengths (nm).
+        d_wavelengths (array_like): Array of uncertainties in the measured wavelengths (nm).
+        calibration_sigma (array_like): Calibration uncertainty (nm), scalar or per line.
+        n_sigma (float): Half-width of the matching window in standard deviations.
+
+        Returns:
+        ndarray: Structured array with one record per (measured line, catalog line) pair
+                 and the fields (line, catalog_line, element, wavelength, residual, z).
+        """
+        wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+        sigma = np.broadcast_to(np.hypot(d_wavelengths, calibration_sigma), wavelengths.shape)
+
+        lo = np.searchsorted(self.wavelength, wavelengths - n_sigma * sigma, side='left')
+        hi = np.searchsorted(self.wavelength, wavelengths + n_sigma * sigma, side='right')
+        counts = hi - lo
+
+        # Expand the candidate ranges into flat (measured, catalog) index pairs
+        line = np.repeat(np.arange(wavelengths.size), counts)
+        first = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        catalog_line = first + np.arange(counts.sum())
+
+        matches = np.empty(line.size, dtype=MATCH_DTYPE)
+        matches['line'] = line
+        matches['catalog_line'] = catalog_line
+        matches['element'] = self.element_index[catalog_line]
+        matches['wavelength'] = self.wavelength[catalog_line]
+        matches['residual'] = wavelengths[line] - matches['wavelength']
+        matches['z'] = matches['residual'] / sigma[line]
+
+        return matches
+
+    def score(self, wavelengths, d_wavelengths, calibration_sigma=0.0, spectrum=None,
+              wavelength_range=None, background=0.05, n_sigma=5.0):
+        """
+        Function Description:
+        Log-likelihood of every element for a batch of spectra. Each measured line is
+        either one of the element's lines, chosen with probability proportional to its
+        relative intensity and observed with Gaussian error of variance
+        d_wavelength**2 + calibration_sigma**2, or (with probability background) a
+        stray line uniform over the wavelength range:
+
+            log L_e = sum_i log((1 - background) sum_j p_ej N(lambda_i; lambda_j, sigma_i)
+                                + background / range)
+
+        Parameters:
+        wavelengths (array_like): Array of measured wavelengths of all spectra (nm).
+        d_wavelengths (array_like): Array of uncertainties in the measured wavelengths (nm).
+        calibration_sigma (array_like): Calibration uncertainty (nm), scalar or per line.
+        spectrum (array_like): Spectrum number (0 ... n_spectra - 1) of every line
+                               (default: all lines belong to one spectrum).
+        wavelength_range (tuple): (min, max) wavelength covered by the spectrometer
+                                  (default: the range of the catalog).
+        background (float): Probability that a measured line is not from the element.
+        n_sigma (float): Window beyond which a catalog line's contribution is neglected.
+
+        Returns:
+        ndarray: Array of log-likelihoods, shape (n_spectra, n_elements), with the
+                 columns in the order of self.elements.
+        """
+        wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+        spectrum = np.zeros(wavelengths.size, dtype=int) if spectrum is None else np.asarray(spectrum)
+        n_spectra = int(spectrum.max()) + 1 if spectrum.size else 0
+        n_elements = self.elements.size
+
+        # Line probabilities p_ej, normalized over each element's lines in range
+        low, high = wavelength_range or (self.wavelength[0], self.wavelength[-1])
+        in_range = (self.wavelength >= low) & (self.wavelength <= high)
+        weight = np.where(in_range, self.intensity, 0.0)
+        total = np.bincount(self.element_index, weights=weight, minlength=n_elements)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probability = weight / total[self.element_index]
+
+        matches = self.match(wavelengths, d_wavelengths, calibration_sigma, n_sigma)
+        sigma = np.broadcast_to(np.hypot(d_wavelengths, calibration_sigma), wavelengths.shape)
+        density = (probability[matches['catalog_line']] * np.exp(-0.5 * matches['z']**2)
+                   / (np.sqrt(2 * np.pi) * sigma[matches['line']]))
+
+        # Mixture density of every measured line under every element
+        cell = matches['line'] * n_elements + matches['element']
+        line_density = np.bincount(cell, weights=density, minlength=wavelengths.size * n_elements)
+        line_density = line_density.reshape(wavelengths.size, n_elements)
+        log_density = np.log((1 - background) * line_density + background / (high - low))
+
+        log_likelihood = np.zeros((n_spectra, n_elements))
+        np.add.at(log_likelihood, spectrum, log_density)
+        return log_likelihood
+
+    def identify(self, wavelengths, d_wavelengths, calibration_sigma=0.0, spectrum=None, **kwargs):
+        """
+        Function Description:
+        Identifies the element of every spectrum in a batch (equal prior probabilities).
+
+        Parameters:
+        wavelengths, d_wavelengths, calibration_sigma, spectrum: As for score.
+        **kwargs: Further keyword arguments passed to score.
+
+        Returns:
+        tuple: A tuple containing (best, posterior) where best holds the most probable
+                element symbol per spectrum and posterior the probabilities, shape
+                (n_spectra, n_elements).
+        """
+        log_likelihood = self.score(wavelengths, d_wavelengths, calibration_sigma, spectrum, **kwargs)
+        posterior = np.exp(log_likelihood - log_likelihood.max(axis=1, keepdims=True))
+        posterior /= posterior.sum(axis=1, keepdims=True)
+        return self.elements[np.argmax(posterior, axis=1)], posterior
+
+def load_catalog(path=CATALOG_PATH):
+    """
+    Function Description:
+    Loads a spectral line catalog from a CSV file with a header row and the columns
+    element, wavelength_nm and relative_intensity.
+
+    Parameters:
+    path (str): Path to the CSV file (default: the bundled catalog).
+
+    Returns:
+    SpectralCatalog: The indexed catalog.
+    """
+    table = np.genfromtxt(path, delimiter=',', names=True, dtype=None, encoding='utf-8')
+    return SpectralCatalog(table['element'], table['wavelength_nm'], table['relative_intensity'])
+
+if __name__ == "__main__":
+    import time
+
+    catalog = load_catalog()
+    print(f"{len(catalog)} lines of {', '.join(catalog.elements)}")
+
+    # Unknown lamp read on the calibrated spectrometer (helium lines, 0.3 nm readings)
+    rng = np.random.default_rng(0)
+    measured = np.array([447.148, 471.314, 492.193, 501.568, 587.562, 667.815, 706.519])
+    measured = measured + rng.normal(0.0, 0.3, measured.size)
+    best, posterior = catalog.identify(measured, 0.3, calibration_sigma=0.2,
+                                       wavelength_range=(380.0, 720.0))
+    print(f"Unknown gas: {best[0]}")
+    for element, p in zip(catalog.elements, posterior[0]):
+        print(f"  P({element}) = {p:.3g}")
+
+    # Batch of 10000 spectra of random elements against a 50000-line catalog
+    n_lines = 50000
+    large = SpectralCatalog(rng.choice(catalog.elements, n_lines), rng.uniform(380.0, 720.0, n_lines),
+                            rng.uniform(1.0, 1000.0, n_lines))
+    n_spectra, lines_per_spectrum = 10000, 8
+    truth = rng.integers(0, large.elements.size, n_spectra)
+    picked = [rng.choice(np.flatnonzero(large.element_index == e), lines_per_spectrum) for e in truth]
+    measured = large.wavelength[np.concatenate(picked)] + rng.normal(0.0, 0.01, n_spectra * lines_per_spectrum)
+    spectrum = np.repeat(np.arange(n_spectra), lines_per_spectrum)
+
+    start = time.perf_counter()
+    best, posterior = large.identify(measured, 0.01, 0.005, spectrum, wavelength_range=(380.0, 720.0))
+    elapsed = time.perf_counter() - start
+    print(f"\n{n_spectra} spectra in {elapsed:.2f} s ({elapsed / n_spectra * 1e3:.3f} ms per spectrum), "
+          f"{np.mean(best == large.elements[truth]):.1%} identified correctly")
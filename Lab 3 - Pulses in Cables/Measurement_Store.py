@@ -0,0 +1,236 @@
+import json
+import os
+import numpy as np
+
+# Name of the metadata index inside a store directory
+INDEX_NAME = 'index.json'
+
+class MeasurementStore:
+    """
+    Class Description:
+    On-disk columnar store for long oscilloscope and meter captures.
+    Each dataset (e.g. one cable length and termination) is a directory of raw
+    binary column files, described by a JSON index holding the row count, column
+    dtypes and per-row shapes, and free-form attributes. Columns are opened with
+    np.memmap, so reads are zero-copy views that can be passed straight to the
+    analysis functions, and new acquisitions are appended to the end of the files.
+
+    Parameters:
+    root (str): Store directory (created if mode is 'a').
+    mode (str): 'r' for read-only or 'a' to allow creating datasets and appending.
+    """
+
+    def __init__(self, root, mode='r'):
+        if mode not in ('r', 'a'):
+            raise ValueError("mode must be 'r' or 'a'")
+        self.root = root
+        self.mode = mode
+
+        index_path = os.path.join(root, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path) as index:
+                self.index = json.load(index)
+        elif mode == 'a':
+            os.makedirs(root, exist_ok=True)
+            self.index = {'version': 1, 'datasets': {}}
+            self._write_index()
+        else:
+            raise FileNotFoundError(f"No measurement store at {root}")
+
+    def _write_index(self):
+        # Write to a temporary file and rename, so readers never see a partial index
+        index_path = os.path.join(self.root, INDEX_NAME)
+        with open(index_path + '.tmp', 'w') as index:
+            json.dump(self.index, index, indent=1)
+        os.replace(index_path + '.tmp', index_path)
+
+    def _column_path(self, name, column):
+        return os.path.join(self.root, name, column + '.bin')
+
+    def names(self):
+        """
+        Function Description:
+        Returns the names of all datasets in the store.
+        """
+        return list(self.index['datasets'])
+
+    def __contains__(self, name):
+        return name in self.index['datasets']
+
+    def __len__(self):
+        return len(self.index['datasets'])
+
+    def info(self, name):
+        """
+        Function Description:
+        Returns the index entry of a dataset (length, columns and attrs).
+        """
+        return self.index['datasets'][name]
+
+    def attrs(self, name):
+        """
+        Function Description:
+        Returns the attributes of a dataset, e.g. cable length or termination.
+        """
+        return self.index['datasets'][name]['attrs']
+
+    def create_dataset(self, name, columns, attrs=None):
+        """
+        Function Description:
+        Creates an empty dataset.
+
+        Parameters:
+        name (str): Dataset name.
+        columns (dict): Mapping of column name to dtype, or to a (dtype, row shape)
+                        tuple for columns holding one fixed-length record per row
+                        (e.g. a scope trace of n samples: ('f4', (n,))).
+        attrs (dict): JSON-serializable attributes of the dataset.
+        """
+        if self.mode != 'a':
+            raise PermissionError("Store is opened read-only")
+        if name in self:
+            raise KeyError(f"Dataset '{name}' already exists")
+
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        description = {}
+        for column, spec in columns.items():
+            dtype, shape = spec if isinstance(spec, tuple) else (spec, ())
+            description[column] = {'dtype': np.dtype(dtype).newbyteorder('<').str,
+                                   'shape': list(shape)}
+            open(self._column_path(name, column), 'wb').close()
+
+        self.index['datasets'][name] = {'length': 0, 'columns': description,
+                                        'attrs': dict(attrs or {})}
+        self._write_index()
+
+    def append(self, name, **arrays):
+        """
+        Function Description:
+        Appends rows to a dataset. Data is written before the index is updated, so
+        concurrent readers only ever see complete rows, and every column is written
+        from its indexed length, so a failed append cannot misalign later ones.
+
+        Parameters:
+        name (str): Dataset name.
+        **arrays (array_like): One array per column, all with the same number of rows.
+
+        Returns:
+        int: New number of rows in the dataset.
+        """
+        if self.mode != 'a':
+            raise PermissionError("Store is opened read-only")
+        dataset = self.index['datasets'][name]
+        columns = dataset['columns']
+        if set(arrays) != set(columns):
+            raise ValueError(f"Expected columns {sorted(columns)}, got {sorted(arrays)}")
+
+        rows = None
+        converted = {}
+        for column, values in arrays.items():
+            spec = columns[column]
+            values = np.asarray(values, dtype=spec['dtype']).reshape((-1,) + tuple(spec['shape']))
+            if rows is not None and values.shape[0] != rows:
+                raise ValueError("All columns must have the same number of rows")
+            rows = values.shape[0]
+            converted[column] = values
+
+        # Write each column at the end of its indexed rows, discarding any bytes left
+        # beyond them by an earlier append that failed partway
+        for column, values in converted.items():
+            spec = columns[column]
+            row_nbytes = np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'], dtype=np.int64))
+            with open(self._column_path(name, column), 'r+b') as column_file:
+                column_file.truncate(dataset['length'] * row_nbytes)
+                column_file.seek(dataset['length'] * row_nbytes)
+                column_file.write(np.ascontiguousarray(values).tobytes())
+
+        dataset['length'] += rows
+        self._write_index()
+        return dataset['length']
+
+    def column(self, name, column, start=0, stop=None):
+        """
+        Function Description:
+        Returns a zero-copy, read-only memory-mapped view of a column.
+
+        Parameters:
+        name (str): Dataset name.
+        column (str): Column name.
+        start (int): First row.
+        stop (int): Row after the last one (default: end of the dataset).
+
+        Returns:
+        ndarray: Array of shape (rows, *row shape).
+        """
+        dataset = self.index['datasets'][name]
+        spec = dataset['columns'][column]
+        dtype = np.dtype(spec['dtype'])
+        shape = (dataset['length'],) + tuple(spec['shape'])
+
+        if dataset['length'] == 0:
+            return np.empty(shape, dtype=dtype)
+
+        data = np.memmap(self._column_path(name, column), dtype=dtype, mode='r', shape=shape)
+        return data[start:stop]
+
+    def dataset(self, name, columns=None):
+        """
+        Function Description:
+        Returns memory-mapped views of several columns of a dataset.
+
+        Parameters:
+        name (str): Dataset name.
+        columns (sequence): Column names (default: all columns).
+
+        Returns:
+        dict: Dictionary mapping column names to arrays.
+        """
+        columns = columns or list(self.index['datasets'][name]['columns'])
+        return {column: self.column(name, column) for column in columns}
+
+    def iter_chunks(self, name, columns=None, chunk_size=1 << 20):
+        """
+        Function Description:
+        Iterates over a dataset in blocks of rows without copying, e.g. to feed a
+        LinearFitAccumulator or the Error_Propagation routines chunk by chunk.
+
+        Parameters:
+        name (str): Dataset name.
+        columns (sequence): Column names (default: all columns).
+        chunk_size (int): Number of rows per chunk.
+
+        Returns:
+        generator: Yields dictionaries mapping column names to array views.
+        """
+        views = self.dataset(name, columns)
+        length = self.index['datasets'][name]['length']
+        for start in range(0, length, chunk_size):
+            yield {column: view[start:start + chunk_size] for column, view in views.items()}
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab 1 - Resistance Exercise'))
+    from Streaming_Fit import LinearFitAccumulator
+
+    rng = np.random.default_rng(0)
+    root = os.path.join(tempfile.mkdtemp(), 'captures')
+
+    # Two appended acquisitions of a DMM V-I log
+    store = MeasurementStore(root, mode='a')
+    store.create_dataset('circuit1_dmm', {'I': 'f8', 'V': 'f8', 'dV': 'f4'}, attrs={'circuit': 1})
+    for _ in range(2):
+        I = rng.uniform(0.0, 0.065, 10**6)
+        store.append('circuit1_dmm', I=I, V=6.501 - 0.05 * I + rng.normal(0.0, 0.005, I.size),
+                     dV=np.full(I.size, 0.005))
+
+    # Reopen read-only and fit chunk by chunk from the memory map
+    store = MeasurementStore(root)
+    accumulator = LinearFitAccumulator()
+    for chunk in store.iter_chunks('circuit1_dmm', chunk_size=250000):
+        accumulator.update(chunk['I'], chunk['V'], chunk['dV'])
+
+    m, b, m_err, b_err = accumulator.result()[:4]
+    print(f"{store.info('circuit1_dmm')['length']} rows in {root}")
+    print(f"Slope: {m:.4f} ± {m_err:.4f} Ω")
+    print(f"Intercept: {b:.5f} ± {b_err:.5f} V")
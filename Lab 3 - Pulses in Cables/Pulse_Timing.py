@@ -0,0 +1,233 @@
+import os
+import sys
+import numpy as np
+
+# The straight-line fitter lives with the Lab 1 analysis code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab 1 - Resistance Exercise'))
+from Linear_Fitting import linear_fitter
+
+# Fields of the structured array returned by arrival_times
+TIMING_DTYPE = np.dtype([
+    ('t_incident', float), ('dt_incident', float), ('amplitude_incident', float),
+    ('t_reflected', float), ('dt_reflected', float), ('amplitude_reflected', float),
+    ('delay', float), ('d_delay', float),
+])
+
+# Fewest pre-trigger samples used for the noise estimate of a trace
+MIN_NOISE_SAMPLES = 16
+
+def cross_correlate(traces, template, max_fft=2**16):
+    """
+    Function Description:
+    FFT cross-correlation of every trace with a pulse template,
+    c[k] = sum_n trace[n + k] * template[n] for lags k = 0 ... n_samples - 1.
+    Traces longer than max_fft are correlated in blocks (overlap-save), so the FFT
+    buffers stay at max_fft samples per trace however long the record is.
+
+    Parameters:
+    traces (array_like): Array of traces, shape (n_traces, n_samples).
+    template (array_like): Pulse template, shape (n_template,).
+    max_fft (int): Largest FFT length used for long traces.
+
+    Returns:
+    ndarray: Array of correlations, shape (n_traces, n_samples).
+    """
+    traces = np.atleast_2d(np.asarray(traces, dtype=float))
+    n_samples = traces.shape[1]
+    n_fft = 1 << int(np.ceil(np.log2(n_samples + len(template))))
+
+    if n_fft <= max_fft:
+        spectrum = np.fft.rfft(traces, n_fft, axis=1)
+        spectrum *= np.conj(np.fft.rfft(template, n_fft))
+        return np.fft.irfft(spectrum, n_fft, axis=1)[:, :n_samples]
+
+    # Each block of n_fft samples yields step lags that do not wrap around
+    n_fft = max(max_fft, 1 << int(np.ceil(np.log2(2 * len(template)))))
+    step = n_fft - len(template) + 1
+    template_spectrum = np.conj(np.fft.rfft(template, n_fft))
+    correlation = np.empty(traces.shape)
+    for lag in range(0, n_samples, step):
+        spectrum = np.fft.rfft(traces[:, lag:lag + n_fft], n_fft, axis=1)
+        spectrum *= template_spectrum
+        valid = min(step, n_samples - lag)
+        correlation[:, lag:lag + valid] = np.fft.irfft(spectrum, n_fft, axis=1)[:, :valid]
+    return correlation
+
+def _refine_peaks(correlation, index):
+    """
+    Function Description:
+    Sub-sample peak positions and heights by fitting a parabola through the
+    three correlation samples around each peak.
+    """
+    rows = np.arange(correlation.shape[0])
+    centre = correlation[rows, index]
+    left = correlation[rows, np.maximum(index - 1, 0)]
+    right = correlation[rows, np.minimum(index + 1, correlation.shape[1] - 1)]
+
+    # Peaks on the first or last lag are not interpolated
+    curvature = left - 2 * centre + right
+    interior = (index > 0) & (index < correlation.shape[1] - 1) & (curvature < 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = np.where(interior, 0.5 * (left - right) / curvature, 0.0)
+    shift = np.clip(shift, -0.5, 0.5)
+    height = centre - 0.25 * (left - right) * shift
+
+    return index + shift, height
+
+def arrival_times(traces, dt, template, t0=0.0, min_separation=None, noise_samples=None,
+                  chunk_size=None, window=None, threshold=0.5, max_samples=2**22):
+    """
+    Function Description:
+    Finds the incident and first reflected pulse arrival times in a batch of
+    oscilloscope traces by FFT cross-correlation with a pulse template, with
+    parabolic sub-sample interpolation and a per-trace timing uncertainty.
+    The incident pulse is the first correlation peak above threshold times the
+    largest one; the reflection is the largest |correlation| peak at least
+    min_separation later, so inverted reflections from shorted or low-impedance
+    loads are found too.
+    Traces are processed in chunks of at most max_samples samples (whole rows, at
+    least one), so memory-mapped captures (e.g. a MeasurementStore column) are never
+    loaded whole, and long records are correlated in blocks by cross_correlate.
+
+    The timing uncertainty is sigma_n / (|a| sqrt(sum(template'**2))) samples,
+    where sigma_n is the trace noise (from the median absolute deviation of the
+    trace's pre-trigger samples) and a the fitted pulse amplitude.
+
+    Parameters:
+    traces (array_like): Array of traces, shape (n_traces, n_samples).
+    dt (float): Sample interval (s).
+    template (array_like): Incident pulse shape sampled at dt, starting at its onset.
+    t0 (float): Time of the first sample (s).
+    min_separation (int): Minimum samples between incident and reflected pulses
+                          (default: the template length).
+    noise_samples (int): Number of leading pre-trigger samples used to estimate the
+                         noise (default: the samples before each trace's incident
+                         pulse, at least MIN_NOISE_SAMPLES and at most 1000).
+    chunk_size (int): Number of traces processed at once (default: from max_samples).
+    window (tuple): Optional (start, stop) sample range to search, for long records.
+    threshold (float): Fraction of the largest correlation peak that marks the incident pulse.
+    max_samples (int): Sample budget of one chunk when chunk_size is not given.
+
+    Returns:
+    ndarray: Structured array with one record per trace and the fields (t_incident,
+             dt_incident, amplitude_incident, t_reflected, dt_reflected,
+             amplitude_reflected, delay, d_delay), times in seconds.
+    """
+    template = np.asarray(template, dtype=float)
+    template_energy = np.dot(template, template)
+    slope_energy = np.sum(np.gradient(template) ** 2)
+    if min_separation is None:
+        min_separation = len(template)
+
+    start, stop = window if window is not None else (0, None)
+    n_traces = len(traces)
+    results = np.empty(n_traces, dtype=TIMING_DTYPE)
+    if chunk_size is None:
+        n_window = len(range(*slice(start, stop).indices(np.shape(traces)[1])))
+        chunk_size = max(1, max_samples // max(n_window, 1))
+
+    for first in range(0, n_traces, chunk_size):
+        chunk = np.asarray(traces[first:first + chunk_size, start:stop], dtype=float)
+        correlation = cross_correlate(chunk, template)
+        lags = np.arange(correlation.shape[1])
+
+        # Incident pulse: first positive correlation peak above threshold * maximum
+        # (an open-ended reflection can be as large as the incident pulse)
+        above = correlation >= threshold * correlation.max(axis=1, keepdims=True)
+        onset = np.argmax(above, axis=1)
+        near_onset = (lags[None, :] >= onset[:, None]) & (lags[None, :] < (onset + len(template))[:, None])
+        incident_index = np.argmax(np.where(near_onset, correlation, -np.inf), axis=1)
+        incident_lag, incident_height = _refine_peaks(correlation, incident_index)
+
+        # Reflected pulse: largest |correlation| after the incident pulse
+        later = lags[None, :] >= (incident_index + min_separation)[:, None]
+        magnitude = np.where(later, np.abs(correlation), -np.inf)
+        reflected_index = np.argmax(magnitude, axis=1)
+        sign = np.sign(correlation[np.arange(len(chunk)), reflected_index])
+        reflected_lag, reflected_height = _refine_peaks(correlation * sign[:, None], reflected_index)
+        reflected_height *= sign
+
+        # Noise from each trace's own pre-trigger samples (median absolute deviation)
+        if noise_samples:
+            pre_trigger = chunk[:, :noise_samples]
+        else:
+            n_noise = np.clip(incident_index, MIN_NOISE_SAMPLES, 1000)
+            pre_trigger = chunk[:, :n_noise.max()]
+            pre_trigger = np.where(lags[None, :pre_trigger.shape[1]] < n_noise[:, None], pre_trigger, np.nan)
+        deviation = np.abs(pre_trigger - np.nanmedian(pre_trigger, axis=1, keepdims=True))
+        sigma_noise = 1.4826 * np.nanmedian(deviation, axis=1)
+
+        amplitude_incident = incident_height / template_energy
+        amplitude_reflected = reflected_height / template_energy
+        with np.errstate(divide='ignore'):
+            dt_incident = sigma_noise / (np.abs(amplitude_incident) * np.sqrt(slope_energy)) * dt
+            dt_reflected = sigma_noise / (np.abs(amplitude_reflected) * np.sqrt(slope_energy)) * dt
+
+        rows = slice(first, first + len(chunk))
+        results['t_incident'][rows] = t0 + (start + incident_lag) * dt
+        results['dt_incident'][rows] = dt_incident
+        results['amplitude_incident'][rows] = amplitude_incident
+        results['t_reflected'][rows] = t0 + (start + reflected_lag) * dt
+        results['dt_reflected'][rows] = dt_reflected
+        results['amplitude_reflected'][rows] = amplitude_reflected
+
+    results['delay'] = results['t_reflected'] - results['t_incident']
+    results['d_delay'] = np.hypot(results['dt_incident'], results['dt_reflected'])
+
+    return results
+
+def velocity_from_delays(lengths, delays, d_delays, round_trip=True):
+    """
+    Function Description:
+    Fits delay vs. cable length with linear_fitter and converts the slope into the
+    propagation velocity. The intercept absorbs any fixed delay (connectors, leads).
+
+    Parameters:
+    lengths (array_like): Array of cable lengths (m).
+    delays (array_like): Array of measured delays (s).
+    d_delays (array_like): Array of uncertainties in the delays (s).
+    round_trip (bool): True if the delays are out-and-back times 2L/v.
+
+    Returns:
+    tuple: A tuple containing (velocity, d_velocity, fit) where fit is the tuple
+            returned by linear_fitter.
+    """
+    fit = linear_fitter(np.asarray(lengths, dtype=float), np.asarray(delays, dtype=float),
+                        np.asarray(d_delays, dtype=float))
+    m, m_stdrd_dev = fit[0], fit[2]
+
+    # delay = (2/v) L + offset, so v = 2/m and dv = 2 dm / m**2
+    factor = 2.0 if round_trip else 1.0
+    velocity = factor / m
+    d_velocity = factor * m_stdrd_dev / m**2
+
+    return velocity, d_velocity, fit
+
+if __name__ == "__main__":
+    import tempfile
+    from Measurement_Store import MeasurementStore
+    from Transmission_Line import bounce_diagram
+
+    # Simulated sweep: 300 traces over 20-120 m of 50 Ω cable, v = 0.66 c, open and shorted ends
+    rng = np.random.default_rng(0)
+    dt = 0.5e-9  # s
+    t = np.arange(8192) * dt
+    pulse = lambda t: np.exp(-0.5 * ((t - 100e-9) / 3e-9) ** 2)
+    lengths = np.repeat(np.linspace(20.0, 120.0, 30), 10)
+    loads = np.where(rng.random(lengths.size) < 0.5, np.inf, 0.0)
+    traces = bounce_diagram(t, pulse, 50.0, 50.0, 1.98e8, lengths, loads, n_bounces=3)['source_end']
+    traces += rng.normal(0.0, 0.01, traces.shape)
+
+    # Store the sweep, then time it straight from the memory map
+    store = MeasurementStore(os.path.join(tempfile.mkdtemp(), 'sweep'), mode='a')
+    store.create_dataset('sweep', {'length': 'f8', 'V': ('f4', (t.size,))}, attrs={'dt': dt})
+    store.append('sweep', length=lengths, V=traces)
+
+    template = pulse(80e-9 + np.arange(80) * dt)
+    timing = arrival_times(store.column('sweep', 'V'), dt, template, min_separation=40)
+    velocity, d_velocity, fit = velocity_from_delays(store.column('sweep', 'length'),
+                                                     timing['delay'], timing['d_delay'])
+
+    print(f"Median timing uncertainty: {np.median(timing['d_delay']) * 1e12:.1f} ps")
+    print(f"Velocity: {velocity:.4e} ± {d_velocity:.1e} m/s (simulated 1.98e8 m/s)")
+    print(f"Offset: {fit[1] * 1e9:.3f} ± {fit[3] * 1e9:.3f} ns, reduced chi-squared {fit[6]:.2f}")
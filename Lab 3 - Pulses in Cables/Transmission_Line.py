@@ -0,0 +1,372 @@
+import os
+import sys
+import numpy as np
+
+# Error propagation routines live with the Lab 1 analysis code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab 1 - Resistance Exercise'))
+from Error_Propagation import multiplication
+
+def reflection_coefficient(Z_L, Z0):
+    """
+    Function Description:
+    Calculates the load reflection coefficient r = V-/V+ = (Z_L - Z0) / (Z_L + Z0).
+    An open load (Z_L = inf) gives r = 1.
+
+    Parameters:
+    Z_L (array_like): Array of load impedances.
+    Z0 (array_like): Array of characteristic impedances.
+
+    Returns:
+    array_like: Array of reflection coefficients.
+    """
+    Z_L = np.asarray(Z_L, dtype=complex if np.iscomplexobj(Z_L) else float)
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isinf(Z_L), 1.0, (Z_L - Z0) / (Z_L + Z0))
+
+def transmission_coefficient(Z_L, Z0):
+    """
+    Function Description:
+    Calculates the load transmission coefficient t = V/V+ = 1 + r = 2 Z_L / (Z_L + Z0).
+
+    Parameters:
+    Z_L (array_like): Array of load impedances.
+    Z0 (array_like): Array of characteristic impedances.
+
+    Returns:
+    array_like: Array of transmission coefficients.
+    """
+    return 1.0 + reflection_coefficient(Z_L, Z0)
+
+def reflection_coefficient_uncertainty(Z_L, dZ_L, Z0, dZ0):
+    """
+    Function Description:
+    Calculates the RMS uncertainty of r (and t = 1 + r) for resistive loads.
+    Z0 appears in both the numerator and denominator of r, so the partial
+    derivatives are used directly rather than chaining the multiplication and
+    addition rules, which would count its uncertainty twice.
+
+    Parameters:
+    Z_L (array_like): Array of load resistances.
+    dZ_L (array_like): Array of uncertainty values for Z_L.
+    Z0 (array_like): Array of characteristic impedances.
+    dZ0 (array_like): Array of uncertainty values for Z0.
+
+    Returns:
+    array_like: Array of RMS uncertainty values for r.
+    """
+    denominator = (Z_L + Z0) ** 2
+    dr_dZ_L = 2 * Z0 / denominator
+    dr_dZ0 = -2 * Z_L / denominator
+    return np.hypot(dr_dZ_L * dZ_L, dr_dZ0 * dZ0)
+
+def characteristic_impedance(L0, dL0, C0, dC0):
+    """
+    Function Description:
+    Calculates Z0 = sqrt(L0 / C0) and the propagation velocity v = 1 / sqrt(L0 C0)
+    of a line from its inductance and capacitance per unit length, with uncertainties.
+
+    Parameters:
+    L0 (array_like): Array of inductances per unit length (H/m).
+    dL0 (array_like): Array of uncertainty values for L0.
+    C0 (array_like): Array of capacitances per unit length (F/m).
+    dC0 (array_like): Array of uncertainty values for C0.
+
+    Returns:
+    tuple: A tuple containing (Z0, dZ0, velocity, d_velocity)
+    """
+    ones = np.ones_like(np.asarray(L0, dtype=float))
+    zeros = np.zeros_like(ones)
+
+    # L0/C0 and L0*C0 share the same relative uncertainty; the square root halves it
+    ratio = L0 / C0
+    d_ratio = multiplication(x=L0, delta_x=dL0, y=C0, delta_y=dC0, w=ones, delta_w=zeros, z=ratio)
+
+    Z0 = np.sqrt(ratio)
+    dZ0 = 0.5 * Z0 * d_ratio / ratio
+    velocity = 1.0 / np.sqrt(L0 * C0)
+    d_velocity = 0.5 * velocity * d_ratio / ratio
+
+    return Z0, dZ0, velocity, d_velocity
+
+def propagation_velocity(length, d_length, delay, d_delay, round_trip=True):
+    """
+    Function Description:
+    Calculates the propagation velocity from a cable length and the measured delay
+    between the incident and reflected pulses, with uncertainty.
+
+    Parameters:
+    length (array_like): Array of cable lengths (m).
+    d_length (array_like): Array of uncertainty values for the lengths.
+    delay (array_like): Array of measured delays (s).
+    d_delay (array_like): Array of uncertainty values for the delays.
+    round_trip (bool): True if the delay is the out-and-back time 2L/v.
+
+    Returns:
+    tuple: A tuple containing (velocity, d_velocity)
+    """
+    length = np.asarray(length, dtype=float)
+    ones = np.ones_like(length)
+    velocity = (2.0 if round_trip else 1.0) * length / delay
+    d_velocity = multiplication(x=length, delta_x=d_length, y=delay, delta_y=d_delay,
+                                w=ones, delta_w=np.zeros_like(ones), z=velocity)
+    return velocity, d_velocity
+
+def predicted_delay(length, d_length, velocity, d_velocity, round_trip=True):
+    """
+    Function Description:
+    Calculates the predicted reflection delay 2L/v (or L/v) with uncertainty.
+
+    Parameters:
+    length (array_like): Array of cable lengths (m).
+    d_length (array_like): Array of uncertainty values for the lengths.
+    velocity (array_like): Array of propagation velocities (m/s).
+    d_velocity (array_like): Array of uncertainty values for the velocities.
+    round_trip (bool): True for the out-and-back delay.
+
+    Returns:
+    tuple: A tuple containing (delay, d_delay)
+    """
+    length = np.asarray(length, dtype=float)
+    ones = np.ones_like(length)
+    delay = (2.0 if round_trip else 1.0) * length / velocity
+    d_delay = multiplication(x=length, delta_x=d_length, y=velocity, delta_y=d_velocity,
+                             w=ones, delta_w=np.zeros_like(ones), z=delay)
+    return delay, d_delay
+
+def load_terms(omega, R_L, C_L=0.0, series=False):
+    """
+    Function Description:
+    Returns the load impedance as a ratio Z_L = numerator / denominator, so open
+    (denominator 0) and shorted (numerator 0) loads need no special cases.
+
+    Parameters:
+    omega (array_like): Array of angular frequencies.
+    R_L (array_like): Load resistance (np.inf for an open, 0 for a short).
+    C_L (array_like): Load capacitance (0 for none if parallel, np.inf for none if series).
+    series (array_like): True for R and C in series, False for R parallel to C.
+
+    Returns:
+    tuple: A tuple containing (numerator, denominator)
+    """
+    R_L = np.asarray(R_L, dtype=float)[..., None]
+    C_L = np.asarray(C_L, dtype=float)[..., None]
+    series = np.asarray(series, dtype=bool)[..., None]
+    jw = 1j * omega
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        # Parallel RC: Z = R / (1 + jwRC), or 1 / (jwC) with no resistor
+        open_R = np.isinf(R_L)
+        parallel_num = np.where(open_R, 1.0, R_L)
+        parallel_den = np.where(open_R, jw * C_L, 1.0 + jw * np.where(open_R, 0.0, R_L) * C_L)
+
+        # Series RC: Z = R + 1 / (jwC) = (1 + jwRC) / (jwC), or R with no capacitor
+        no_C = np.isinf(C_L)
+        series_num = np.where(no_C, R_L, 1.0 + jw * R_L * np.where(no_C, 0.0, C_L))
+        series_den = np.where(no_C, 1.0, jw * np.where(no_C, 0.0, C_L))
+        series_num = np.where(open_R, 1.0, series_num)
+        series_den = np.where(open_R, 0.0, series_den)
+
+    return np.where(series, series_num, parallel_num), np.where(series, series_den, parallel_den)
+
+def simulate_pulse_response(t, source, R_s, Z0, velocity, length, R_L, C_L=0.0, series=False,
+                            attenuation=0.0, reference_frequency=1e6, pad_factor=4):
+    """
+    Function Description:
+    Simulates the voltages at the source and load ends of a chain of coaxial cable
+    segments driven by a pulse generator, for many configurations at once.
+    Each segment is a two-port ABCD matrix evaluated on an FFT frequency grid; the
+    chain is terminated by a resistive, open, shorted or RC load. Losses use a
+    skin-effect attenuation alpha(f) = attenuation * sqrt(f / reference_frequency)
+    with a real Z0 (low-loss approximation).
+
+    Parameters:
+    t (array_like): Uniformly spaced sample times (s), starting at 0.
+    source (array_like): Generator EMF samples, shape (n,) or (configs, n).
+    R_s (array_like): Generator output resistance per configuration (Ω).
+    Z0 (array_like): Characteristic impedance, shape (configs, segments) for chains
+                     of segments; scalars and 1-D arrays are one cable per
+                     configuration, as in bounce_diagram.
+    velocity (array_like): Propagation velocity (m/s), same layout as Z0.
+    length (array_like): Segment length (m), same layout as Z0.
+    R_L (array_like): Load resistance per configuration (np.inf open, 0 short).
+    C_L (array_like): Load capacitance per configuration (see load_terms).
+    series (array_like): Load topology per configuration (see load_terms).
+    attenuation (array_like): Attenuation at reference_frequency (Np/m), same layout as Z0.
+    reference_frequency (float): Frequency at which attenuation is given (Hz).
+    pad_factor (int): Zero-padding factor of the FFT, to suppress wrap-around.
+
+    Returns:
+    dict: Dictionary with arrays of shape (configs, n) for 'source_end' (total voltage
+          at the generator), 'incident', 'reflected' (source_end - incident) and 'load'.
+    """
+    t = np.asarray(t, dtype=float)
+    n = t.size
+    dt = t[1] - t[0]
+    n_fft = 1 << int(np.ceil(np.log2(pad_factor * n)))
+
+    # Number of configurations from every per-configuration input; 1-D segment
+    # inputs are one value per configuration, a chain needs (configs, segments)
+    segments = [np.asarray(a, dtype=float) for a in (Z0, velocity, length, attenuation)]
+    segments = [a.reshape(-1, 1) if a.ndim < 2 else a for a in segments]
+    n_configs = np.broadcast_shapes(*(a.shape[:1] for a in segments), np.shape(source)[:-1],
+                                    np.shape(R_s), np.shape(R_L), np.shape(C_L), np.shape(series))
+    n_configs = n_configs[0] if n_configs else 1
+    n_segments = np.broadcast_shapes(*(a.shape[1:] for a in segments))[0]
+    Z0, velocity, length, attenuation = (np.broadcast_to(a, (n_configs, n_segments)) for a in segments)
+
+    frequency = np.fft.rfftfreq(n_fft, dt)
+    omega = 2 * np.pi * frequency
+    S = np.fft.rfft(np.broadcast_to(source, (n_configs, n)), n_fft, axis=-1)
+
+    # Chain ABCD matrices, one segment at a time, vectorized over configs and frequency
+    skin = np.sqrt(frequency / reference_frequency)
+    for k in range(n_segments):
+        z0 = Z0[:, k, None]
+
+        # cosh and sinh of (alpha + j beta) l from real functions, cheaper than complex ones
+        loss = attenuation[:, k, None] * length[:, k, None] * skin
+        phase = omega * (length[:, k, None] / velocity[:, k, None])
+        cos_phase = np.cos(phase)
+        sin_phase = np.sin(phase)
+        cosh_loss = np.cosh(loss)
+        sinh_loss = np.sinh(loss)
+        cosh = cosh_loss * cos_phase + 1j * (sinh_loss * sin_phase)
+        sinh = sinh_loss * cos_phase + 1j * (cosh_loss * sin_phase)
+
+        if k == 0:
+            A, B, C, D = cosh, z0 * sinh, sinh / z0, cosh
+        else:
+            A, B, C, D = (A * cosh + B * (sinh / z0), A * (z0 * sinh) + B * cosh,
+                          C * cosh + D * (sinh / z0), C * (z0 * sinh) + D * cosh)
+
+    numerator, denominator = load_terms(omega, np.broadcast_to(R_L, n_configs),
+                                        np.broadcast_to(C_L, n_configs),
+                                        np.broadcast_to(series, n_configs))
+    R_s = np.broadcast_to(np.asarray(R_s, dtype=float), n_configs)[:, None]
+
+    # V_in = Z_in I_in with Z_in = (A Z_L + B) / (C Z_L + D), written with Z_L = num/den
+    top = A * numerator + B * denominator
+    bottom = C * numerator + D * denominator
+    total = top + R_s * bottom
+    V_in = S * top / total
+    V_load = S * numerator / total
+
+    source_end = np.fft.irfft(V_in, n_fft, axis=-1)[:, :n]
+    load = np.fft.irfft(V_load, n_fft, axis=-1)[:, :n]
+    incident = np.broadcast_to(source, (n_configs, n)) * (Z0[:, :1] / (Z0[:, :1] + R_s))
+
+    return {'source_end': source_end, 'incident': incident,
+            'reflected': source_end - incident, 'load': load}
+
+def pulse_response_uncertainty(t, source, R_s, Z0, dZ0, velocity, d_velocity, length, R_L, **kwargs):
+    """
+    Function Description:
+    Simulates the pulse response and its uncertainty due to the uncertainties in Z0
+    and the propagation velocity. Each parameter is shifted by plus and minus one
+    standard deviation (all segments of a configuration together); half the
+    difference of the two responses is its first-order contribution, and the Z0 and
+    velocity contributions are added in quadrature as in Error_Propagation.
+
+    Parameters:
+    t, source, R_s, Z0, velocity, length, R_L: As for simulate_pulse_response.
+    dZ0 (array_like): Array of uncertainty values for Z0, same layout as Z0.
+    d_velocity (array_like): Array of uncertainty values for velocity, same layout as Z0.
+    **kwargs: Further keyword arguments passed to simulate_pulse_response.
+
+    Returns:
+    tuple: A tuple containing (response, uncertainty), two dictionaries with the
+           waveforms of simulate_pulse_response and their uncertainties.
+    """
+    Z0 = np.asarray(Z0, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+
+    response = simulate_pulse_response(t, source, R_s, Z0, velocity, length, R_L, **kwargs)
+    variance = {name: 0.0 for name in response}
+    for shifted_Z0, shifted_velocity in (((Z0 + dZ0, Z0 - dZ0), (velocity, velocity)),
+                                         ((Z0, Z0), (velocity + d_velocity, velocity - d_velocity))):
+        upper = simulate_pulse_response(t, source, R_s, shifted_Z0[0], shifted_velocity[0], length, R_L, **kwargs)
+        lower = simulate_pulse_response(t, source, R_s, shifted_Z0[1], shifted_velocity[1], length, R_L, **kwargs)
+        for name in variance:
+            variance[name] = variance[name] + (0.5 * (upper[name] - lower[name])) ** 2
+
+    return response, {name: np.sqrt(value) for name, value in variance.items()}
+
+def bounce_diagram(t, pulse, R_s, Z0, velocity, length, R_L, n_bounces=20):
+    """
+    Function Description:
+    Lossless single-cable response with resistive source and load, summed directly
+    from the bounce diagram. Faster than simulate_pulse_response for this case and
+    exact in time (no FFT grid), but limited to frequency-independent terminations.
+
+    Parameters:
+    t (array_like): Sample times (s).
+    pulse (callable): Vectorized generator EMF v_s(t), e.g. lambda t: (t > 0) & (t < 10e-9).
+    R_s (array_like): Generator output resistance per configuration (Ω).
+    Z0 (array_like): Characteristic impedance per configuration (Ω).
+    velocity (array_like): Propagation velocity per configuration (m/s).
+    length (array_like): Cable length per configuration (m).
+    R_L (array_like): Load resistance per configuration (np.inf open, 0 short).
+    n_bounces (int): Number of round trips to include.
+
+    Returns:
+    dict: Dictionary with arrays of shape (configs, n) for 'source_end', 'incident',
+          'reflected' and 'load'.
+    """
+    t = np.asarray(t, dtype=float)
+    R_s, Z0, velocity, length, R_L = (np.atleast_1d(np.asarray(a, dtype=float))[:, None, None]
+                                      for a in np.broadcast_arrays(R_s, Z0, velocity, length, R_L))
+
+    launch = Z0 / (Z0 + R_s)
+    r_L = reflection_coefficient(R_L, Z0)
+    r_s = reflection_coefficient(R_s, Z0)
+    T = length / velocity
+    n = np.arange(n_bounces)[None, :, None]
+
+    # k-th return to the source after 2(k+1)T, k-th arrival at the load after (2k+1)T
+    round_trips = (r_L * r_s) ** n
+    incident = launch[:, 0] * pulse(t)[None, :]
+    reflected = (launch * (1 + r_s) * r_L * round_trips * pulse(t - 2 * (n + 1) * T)).sum(axis=1)
+    load = (launch * (1 + r_L) * round_trips * pulse(t - (2 * n + 1) * T)).sum(axis=1)
+
+    return {'source_end': incident + reflected, 'incident': incident,
+            'reflected': reflected, 'load': load}
+
+if __name__ == "__main__":
+    import time
+
+    # RG-58 like cable: Z0 = 50 Ω, v = 0.66 c, driven through 50 Ω by a 10 ns pulse
+    t = np.arange(4096) * 0.25e-9  # s
+    pulse = lambda t: ((t >= 0) & (t < 10e-9)).astype(float)
+
+    R_L = np.array([np.inf, 0.0, 50.0, 100.0, 25.0])
+    names = ["open", "short", "matched", "100 Ω", "25 Ω"]
+    lossless = simulate_pulse_response(t, pulse(t), 50.0, 50.0, 2.0e8, 100.0, R_L)
+    bounced = bounce_diagram(t, pulse, 50.0, 50.0, 2.0e8, 100.0, R_L)
+
+    for name, r, fft_trace, exact_trace in zip(names, reflection_coefficient(R_L, 50.0),
+                                               lossless['reflected'], bounced['reflected']):
+        print(f"{name:8s} r = {r:+.3f}, reflected peak {fft_trace[np.argmax(np.abs(fft_trace))]:+.3f} V "
+              f"(bounce diagram {exact_trace[np.argmax(np.abs(exact_trace))]:+.3f} V)")
+
+    # Velocity from a measured round-trip delay, and Z0 uncertainty on r
+    v, dv = propagation_velocity(100.0, 0.05, 1.01e-6, 0.01e-6)
+    print(f"\nv = {v:.3e} ± {dv:.3e} m/s")
+    print(f"r(100 Ω) = {reflection_coefficient(100.0, 50.0):.3f} ± "
+          f"{reflection_coefficient_uncertainty(100.0, 0.5, 50.0, 2.0):.3f}")
+
+    # Predicted 100 Ω load waveform with Z0 = 50 ± 2 Ω and v = (2.00 ± 0.02) x 10^8 m/s
+    response, uncertainty = pulse_response_uncertainty(t, pulse(t), 50.0, 50.0, 2.0, 2.0e8, 0.02e8, 100.0, 100.0)
+    delay, d_delay = predicted_delay(100.0, 0.0, 2.0e8, 0.02e8)
+    centre = np.searchsorted(t, delay + 5e-9)
+    print(f"100 Ω echo at {delay * 1e9:.0f} ± {d_delay * 1e9:.0f} ns, centre {response['reflected'][0, centre]:.3f} ± "
+          f"{uncertainty['reflected'][0, centre]:.3f} V")
+
+    # Throughput of the FFT engine on a batch of lossy configurations
+    rng = np.random.default_rng(0)
+    configs = 2000
+    t_short = np.arange(1024) * 1e-9
+    start = time.perf_counter()
+    simulate_pulse_response(t_short, pulse(t_short), 50.0, 50.0, 2.0e8,
+                            rng.uniform(10, 100, (configs, 2)), rng.uniform(0, 200, configs),
+                            C_L=rng.uniform(0, 1e-10, configs), attenuation=0.002, pad_factor=2)
+    print(f"\n{configs / (time.perf_counter() - start):.0f} lossy two-segment configurations per second")